@@ -1,27 +1,45 @@
 """Module for AI script writing for the news podcast maker."""
 # Python standard libraries
 import sys  # Added for sys.exit
-import os
 import datetime
 import random
-from typing import List, Dict, Tuple  # Removed unused Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple  # Removed unused Any
 
-# 3rd party imports
-from openai import OpenAI
+# Local imports
+import metrics
+from cache import DiskCache
+from openai_client import get_client, record_usage, with_retry
+from llm_cache import chat_completion, completion_key, llm_cache_enabled, lookup, store
 
-def get_current_date() -> str:
-    """Return the current date and time as a formatted string."""
+def get_current_date(stable: bool = False) -> str:
+    """Return the current date and time as a formatted string.
+
+    With `stable=True` the time is rounded down to the hour, so prompts that mention it
+    stay identical (and cacheable) for the rest of the hour.
+    """
     current_time: datetime.datetime = datetime.datetime.now()
+    if stable:
+        current_time = current_time.replace(minute=0, second=0, microsecond=0)
     return current_time.strftime("%A, %B %d, %Y %I:%M %p")
 
-def pick_voice() -> str:
-    """Pick a random voice from a predefined list excluding 'coral'."""
+def pick_voice(seed: Optional[str] = None) -> str:
+    """Pick a random voice from a predefined list excluding 'coral'.
+
+    The same `seed` always picks the same voice.
+    """
     voices: List[str] = [
         'alloy', 'ash', 'coral', 'echo', 'fable',
         'onyx', 'nova', 'sage', 'shimmer'
     ]
     voices.remove('coral')  # Remove Coral because it is too dramatic
-    return random.choice(voices)
+    return random.Random(seed).choice(voices) if seed is not None else random.choice(voices)
+
+def pick_host(news: List[Dict[str, str]]) -> str:
+    """Pick the host's voice; fixed per article set while the LLM cache is in use."""
+    if llm_cache_enabled():
+        return pick_voice(DiskCache.make_key([article['headline'] for article in news]))
+    return pick_voice()
 
 def get_personality(voicename: str) -> str:
     """Return the personality description for the given voice name."""
@@ -49,9 +67,6 @@ def create_headline_for_podcast(script: str) -> str:
     """
     Create a creative title for this podcast episode based on the provided script.
     """
-    # Initialize the client
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
     instructions: list = [
         "Create a creative title for this podcast episode based on the script provided.",
         "The title should be between 5-10 words long and should be engaging and informative.",
@@ -67,40 +82,19 @@ def create_headline_for_podcast(script: str) -> str:
         "content": script
     }
 
-    # Send the API request
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=system_messages + [user_message],
-        temperature=0.7
-    )
-
-    # Extract the generated title
-    title = response.choices[0].message.content
+    # Send the API request (or reuse a cached response)
+    title = chat_completion(system_messages + [user_message], temperature=0.7,
+                            span="openai.chat.headline")
 
     # Append the date to the title
     title += f" - {get_current_date()}"
 
     return title
 
-def write_script(news: List[Dict[str, str]], language: str = 'en') -> Tuple[str, str, str]:
+def script_messages(news: List[Dict[str, str]], host_name: str) -> List[Dict[str, str]]:
     """
-    Generates a news script based on the provided top 5 stories.
-
-    Args:
-        news (List[Dict[str, str]]): A list of dictionaries, each containing 'publisher', 
-        'headline', and 'content'.
-        language (str, optional): The language for the script. Defaults to English ('en').
-
-    Returns:
-        Tuple[str, str]: The generated script, the host's name, and the headline.
+    Build the chat messages that ask the model for a news script read by `host_name`.
     """
-    _ = language  # Mark language as used to avoid unused argument warning
-
-    # Initialize OpenAI client
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    # Get the host's name and personality
-    host_name = pick_voice()
     host_personality = get_personality(host_name)
 
     # Define system instructions
@@ -108,8 +102,9 @@ def write_script(news: List[Dict[str, str]], language: str = 'en') -> Tuple[str,
         "You are a news anchor. Write an engaging briefing-style script about the top 5 stories.",
         "Only include text to be spoken aloud without cues or directions.",
         "Include the news outlet for each story.",
-        (f"It is currently {get_current_date()}. Your name is {host_name} and your personality is "
-         f"{host_personality}. You are a host for The Rundown."),
+        (f"It is currently {get_current_date(stable=llm_cache_enabled())}. Your name is "
+         f"{host_name} and your personality is {host_personality}. You are a host for "
+         "The Rundown."),
         "Ensure smooth transitions between stories, and include an introduction and conclusion.",
         "Add 2 new lines between each story and section for clarity."
     ]
@@ -126,21 +121,141 @@ def write_script(news: List[Dict[str, str]], language: str = 'en') -> Tuple[str,
         ])
     }
 
-    # Send API request
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=system_messages + [user_message],
-        temperature=0.7
-    )
+    return system_messages + [user_message]
+
+def generate_script(news: List[Dict[str, str]], language: str = 'en',
+                    voice: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Generates a news script based on the provided top 5 stories, without a headline.
+
+    Args:
+        news (List[Dict[str, str]]): A list of dictionaries, each containing 'publisher',
+        'headline', and 'content'.
+        language (str, optional): The language for the script. Defaults to English ('en').
+        voice (str, optional): The host's voice. Defaults to a randomly picked voice.
+
+    Returns:
+        Tuple[str, str]: The generated script and the host's name.
+    """
+    _ = language  # Mark language as used to avoid unused argument warning
+
+    # Get the host's name
+    host_name = voice or pick_host(news)
+
+    # Send API request (or reuse a cached response)
+    script = chat_completion(script_messages(news, host_name), temperature=0.7,
+                             span="openai.chat.script")
+    return script, host_name
 
-    # Extract the generated script
-    script = response.choices[0].message.content
+def write_script(news: List[Dict[str, str]], language: str = 'en',
+                 voice: Optional[str] = None) -> Tuple[str, str, str]:
+    """
+    Generates a news script based on the provided top 5 stories.
+
+    Args:
+        news (List[Dict[str, str]]): A list of dictionaries, each containing 'publisher', 
+        'headline', and 'content'.
+        language (str, optional): The language for the script. Defaults to English ('en').
+        voice (str, optional): The host's voice. Defaults to a randomly picked voice.
+
+    Returns:
+        Tuple[str, str]: The generated script, the host's name, and the headline.
+    """
+    script, host_name = generate_script(news, language, voice)
 
     # Generate a headline for the podcast episode
     headline = create_headline_for_podcast(script)
 
     return script, host_name, headline
 
+class ScriptStream:
+    """
+    A news script streamed from the model one paragraph at a time.
+
+    Iterating yields each paragraph as soon as the blank line after it arrives, using the
+    "two new lines between each story" convention from the prompt. Once the script is
+    complete the headline is requested in the background; `headline()` waits for it.
+    """
+
+    def __init__(self, news: List[Dict[str, str]], language: str = 'en',
+                 voice: Optional[str] = None) -> None:
+        _ = language  # Mark language as used to avoid unused argument warning
+        self.news: List[Dict[str, str]] = news
+        self.host_name: str = voice or pick_host(news)
+        self.script: str = ""
+        self._headline: Optional[Future] = None
+
+    def __iter__(self) -> Iterator[str]:
+        messages = script_messages(self.news, self.host_name)
+        key = completion_key("gpt-4o-mini", messages, 0.7)
+        cached = lookup(key)
+        if cached is not None:
+            yield from (paragraph.strip() for paragraph in cached.split("\n\n")
+                        if paragraph.strip())
+            self._finish(cached)
+            return
+
+        client = get_client()
+        with metrics.span("openai.chat.script_stream"):
+            # Only opening the stream is retried; nothing has been yielded at that point
+            stream = with_retry(lambda: client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True}
+            ))
+
+        buffer: str = ""
+        parts: List[str] = []
+        for chunk in stream:
+            if chunk.usage is not None:
+                record_usage(chunk.usage)  # Sent in a final chunk without choices
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            text: str = chunk.choices[0].delta.content
+            parts.append(text)
+            buffer += text
+            # Hand over every paragraph that is followed by a blank line
+            while "\n\n" in buffer:
+                paragraph, buffer = buffer.split("\n\n", 1)
+                if paragraph.strip():
+                    yield paragraph.strip()
+        if buffer.strip():
+            yield buffer.strip()
+
+        store(key, "".join(parts), "gpt-4o-mini")
+        self._finish("".join(parts))
+
+    def _finish(self, script: str) -> None:
+        # Generate the headline while the caller finishes with the last paragraphs
+        self.script = script
+        executor = ThreadPoolExecutor(max_workers=1)
+        self._headline = executor.submit(create_headline_for_podcast, self.script)
+        executor.shutdown(wait=False)
+
+    def headline(self, timeout: Optional[float] = None) -> str:
+        """Return the episode headline, waiting for it if it is still being generated."""
+        if self._headline is None:
+            raise RuntimeError("The script has not been fully streamed yet")
+        return self._headline.result(timeout=timeout)
+
+def write_script_stream(news: List[Dict[str, str]], language: str = 'en',
+                        voice: Optional[str] = None) -> ScriptStream:
+    """
+    Stream a news script based on the provided top 5 stories.
+
+    Args:
+        news (List[Dict[str, str]]): A list of dictionaries, each containing 'publisher',
+        'headline', and 'content'.
+        language (str, optional): The language for the script. Defaults to English ('en').
+        voice (str, optional): The host's voice. Defaults to a randomly picked voice.
+
+    Returns:
+        ScriptStream: Iterable of script paragraphs, with the host's name and the headline.
+    """
+    return ScriptStream(news, language, voice)
+
 if __name__ == "__main__":
     print("This script is not meant to be run directly. Run main.py instead.")
     sys.exit(1)
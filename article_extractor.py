@@ -0,0 +1,162 @@
+"""
+Extraction of the main article text from publisher HTML pages.
+
+Two interchangeable backends are provided:
+
+- `lxml`: parses with lxml's C parser, strips boilerplate (navigation, headers, footers,
+  sidebars, share and newsletter blocks, scripts) and keeps only the paragraphs of the
+  block that holds most of the page's prose. Used by default when lxml is installed.
+- `soup`: the original BeautifulSoup `html.parser` extraction of every `<p>` tag. Used when
+  lxml is unavailable, or when the main-content detection finds nothing.
+
+Set PODCAST_EXTRACTOR=soup (or lxml) to force a backend.
+"""
+
+# Python standard libraries
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Protocol
+
+# 3rd party imports
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAVE_LXML: bool = True
+except ImportError:  # Optional; fall back to BeautifulSoup
+    HAVE_LXML = False
+
+EXTRACTOR_ENV: str = "PODCAST_EXTRACTOR"
+BOILERPLATE_TAGS: List[str] = ["script", "style", "noscript", "template", "svg", "iframe",
+                               "form", "button", "nav", "header", "footer", "aside"]
+BOILERPLATE_PATTERN = re.compile(
+    r"nav|menu|footer|header|sidebar|breadcrumb|comment|share|social|promo|related|"
+    r"newsletter|subscribe|signup|cookie|consent|advert|\bads?\b|sponsor|banner|popup|modal",
+    re.IGNORECASE,
+)
+CONTENT_PATTERN = re.compile(r"article|body|content|main|story|entry|post", re.IGNORECASE)
+MIN_PARAGRAPH_CHARS: int = 25  # Shorter paragraphs are kept only if they contain no links
+MAX_LINK_DENSITY: float = 0.5  # Paragraphs that are mostly link text are navigation
+
+
+class Extractor(Protocol):
+    """Turns an HTML page into the article's plain text, one paragraph per line."""
+    name: str
+
+    def extract(self, html: str) -> str:
+        """Return the article text found in `html`."""
+
+
+class SoupExtractor:
+    """The original extractor: every `<p>` on the page, parsed with `html.parser`."""
+    name: str = "soup"
+
+    def extract(self, html: str) -> str:
+        """Return the text of every paragraph on the page."""
+        soup = BeautifulSoup(html, "html.parser")
+        return "\n".join(p.get_text() for p in soup.find_all("p"))
+
+
+class LxmlExtractor:
+    """Main-content extractor built on lxml that drops page boilerplate."""
+    name: str = "lxml"
+
+    def __init__(self, fallback: Optional[Extractor] = None):
+        self.fallback: Extractor = fallback or SoupExtractor()
+
+    @staticmethod
+    def _attributes(element) -> str:
+        return f"{element.get('class', '')} {element.get('id', '')} {element.get('role', '')}"
+
+    def _is_boilerplate(self, element) -> bool:
+        if element.tag in BOILERPLATE_TAGS:
+            return True
+        if BOILERPLATE_PATTERN.search(self._attributes(element)) is None:
+            return False
+        # Layout wrappers such as <div class="with-sidebar"> may still hold the story
+        return not any(child.tag in ("article", "main")
+                       or CONTENT_PATTERN.search(self._attributes(child))
+                       for child in element.iter(etree.Element))
+
+    @staticmethod
+    def _paragraph_text(paragraph) -> Optional[str]:
+        text = " ".join(paragraph.text_content().split())
+        if not text:
+            return None
+        link_chars = sum(len(link.text_content()) for link in paragraph.iter("a"))
+        if link_chars and (len(text) < MIN_PARAGRAPH_CHARS
+                           or link_chars / len(text) > MAX_LINK_DENSITY):
+            return None
+        return text
+
+    def _strip_boilerplate(self, root) -> None:
+        # Collect first, then remove, so removal does not disturb the iteration
+        doomed = [element for element in root.iter(etree.Element)
+                  if element.tag not in ("html", "body", "article", "main")
+                  and self._is_boilerplate(element)]
+        for element in doomed:
+            if element.getparent() is not None:
+                element.drop_tree()  # Keeps the text that follows the element
+
+    @staticmethod
+    def _main_block(root):
+        # Explicit markup for the article body wins
+        for query in ('//*[@itemprop="articleBody"]', "//article", "//main", '//*[@role="main"]'):
+            matches = [m for m in root.xpath(query) if m.find(".//p") is not None]
+            if matches:
+                return max(matches, key=lambda m: len(m.text_content()))
+
+        # Otherwise pick the element whose direct paragraphs hold the most text
+        scores: Dict[object, int] = {}
+        for paragraph in root.iter("p"):
+            parent = paragraph.getparent()
+            if parent is not None:
+                scores[parent] = scores.get(parent, 0) + len(paragraph.text_content())
+        return max(scores, key=scores.get) if scores else None
+
+    def extract(self, html: str) -> str:
+        """Return the paragraphs of the page's main content block."""
+        try:
+            root = lxml.html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            return self.fallback.extract(html)
+
+        self._strip_boilerplate(root)
+        block = self._main_block(root)
+        if block is None:
+            return self.fallback.extract(html)
+        paragraphs = [text for text in map(self._paragraph_text, block.iter("p")) if text]
+        return "\n".join(paragraphs) if paragraphs else self.fallback.extract(html)
+
+
+EXTRACTORS: Dict[str, type] = {"soup": SoupExtractor}
+if HAVE_LXML:
+    EXTRACTORS["lxml"] = LxmlExtractor
+
+_default: Optional[Extractor] = None
+
+
+def get_extractor(name: Optional[str] = None) -> Extractor:
+    """
+    Return the extractor called `name`, or the configured default.
+
+    The default is PODCAST_EXTRACTOR if set, otherwise lxml when installed and soup if not.
+    """
+    global _default  # pylint: disable=global-statement
+    if name is None:
+        if _default is None:
+            _default = get_extractor(os.getenv(EXTRACTOR_ENV) or ("lxml" if HAVE_LXML else "soup"))
+        return _default
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}' (available: {', '.join(EXTRACTORS)})")
+    return EXTRACTORS[name]()
+
+def extract_article(html: str) -> str:
+    """Extract the article text from `html` with the default extractor."""
+    return get_extractor().extract(html)
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
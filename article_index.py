@@ -0,0 +1,221 @@
+"""
+Persistent index of the articles seen by earlier runs.
+
+Top headlines change slowly, so most stories in a run were already scraped and condensed
+by a previous one. The index stores, per article URL, the headline and publish time it was
+listed with, a SimHash of its text and its condensed text. `fetch_indexed_news` uses it to:
+
+- skip scraping stories whose listing is unchanged and that were checked recently,
+- reuse the stored condensed text when a re-scraped story has not materially changed,
+- only scrape and condense new or changed stories, and
+- optionally return only those (`new_only`), for update episodes.
+
+The index is a SQLite database in `.cache/`; it is bypassed when PODCAST_NO_CACHE is set.
+"""
+
+# Python standard libraries
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Local imports
+import metrics
+from cache import CACHE_ROOT, cache_bypassed
+from condense import TOKENS_PER_STORY, condense_news, condense_text, deduplicate
+from fingerprint import hamming_distance, simhash
+from news_fetcher import (NO_URL_MESSAGE, create_session, fetch_headlines, fetch_news,
+                          get_full_articles, scrape_failed, structure_article)
+
+INDEX_PATH: Path = CACHE_ROOT / "articles.sqlite3"
+RECHECK_AFTER: float = 6 * 60 * 60  # Re-scrape unchanged listings after this many seconds
+CHANGE_DISTANCE: int = 3  # SimHash bits that may differ before a story counts as changed
+RETENTION: float = 30 * 24 * 60 * 60  # Forget articles not seen for this long
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    headline TEXT NOT NULL,
+    published_at TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    content TEXT NOT NULL,
+    condensed TEXT NOT NULL,
+    budget INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_checked REAL NOT NULL,
+    last_changed REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class IndexedArticle:
+    """An article as stored by a previous run."""
+    url: str
+    headline: str
+    published_at: str
+    fingerprint: int
+    content: str
+    condensed: str
+    budget: int
+    first_seen: float
+    last_seen: float
+    last_checked: float
+    last_changed: float
+
+    def listing_matches(self, headline: str, published_at: str) -> bool:
+        """Return True if NewsAPI still lists the article the way it was stored."""
+        return self.headline == headline and self.published_at == published_at
+
+
+class ArticleIndex:
+    """SQLite-backed store of previously seen articles, keyed by URL."""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Several runs may share the index; WAL lets readers proceed while one writes
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+
+    def get(self, url: str) -> Optional[IndexedArticle]:
+        """Return the stored article for `url`, if any."""
+        row = self.connection.execute(
+            "SELECT url, headline, published_at, fingerprint, content, condensed, budget, "
+            "first_seen, last_seen, last_checked, last_changed FROM articles WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        values = list(row)
+        values[3] = int(values[3], 16)
+        return IndexedArticle(*values)
+
+    def store(self, url: str, headline: str, published_at: str, fingerprint: int,
+              content: str, condensed: str, budget: int, changed: bool) -> None:
+        """Insert or update an article after it has been scraped."""
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET headline = excluded.headline, "
+                "published_at = excluded.published_at, fingerprint = excluded.fingerprint, "
+                "content = excluded.content, condensed = excluded.condensed, "
+                "budget = excluded.budget, last_seen = excluded.last_seen, "
+                "last_checked = excluded.last_checked, "
+                "last_changed = CASE WHEN ? THEN excluded.last_changed ELSE last_changed END",
+                (url, headline, published_at, f"{fingerprint:016x}", content, condensed, budget,
+                 now, now, now, now, changed),
+            )
+
+    def mark_seen(self, urls: List[str]) -> None:
+        """Record that the articles were listed again in this run."""
+        with self.connection:
+            self.connection.executemany("UPDATE articles SET last_seen = ? WHERE url = ?",
+                                        [(time.time(), url) for url in urls])
+
+    def prune(self, retention: float = RETENTION) -> int:
+        """Forget articles that have not been listed for `retention` seconds."""
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM articles WHERE last_seen < ?",
+                                             (time.time() - retention,))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def __enter__(self) -> "ArticleIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def fetch_indexed_news(country: str = "us",
+                       max_articles: int = 5,
+                       tokens_per_story: int = TOKENS_PER_STORY,
+                       new_only: bool = False,
+                       deadline: float = 20.0,
+                       index_path: Path = INDEX_PATH) -> List[Dict[str, Any]]:
+    """
+    Fetch and condense the top stories, doing work only for new or changed articles.
+
+    Args:
+        country: 2-letter ISO 3166-1 code of the country
+        max_articles: Maximum number of articles to fetch
+        tokens_per_story: Token budget for each article's content
+        new_only: Leave out stories that are unchanged since an earlier run
+        deadline: Seconds to wait for the scraped articles
+        index_path: Location of the article index
+
+    Returns:
+        List[Dict[str, Any]]: Condensed articles like `condense_news` returns, each with a
+        'status' of 'new', 'changed' or 'unchanged'
+    """
+    if cache_bypassed():
+        return [{**article, "status": "new"}
+                for article in condense_news(fetch_news(country, max_articles, deadline=deadline),
+                                             tokens_per_story)]
+
+    session = create_session()
+    listings = fetch_headlines(country, max_articles, session)
+    now = time.time()
+
+    with ArticleIndex(index_path) as index:
+        stored = [index.get(listing.get("url") or "") for listing in listings]
+
+        # Scrape only articles that are new, listed differently, or not checked recently
+        to_scrape = [i for i, (listing, record) in enumerate(zip(listings, stored))
+                     if listing.get("url") and (
+                         record is None
+                         or not record.listing_matches(listing.get("title", ""),
+                                                       listing.get("publishedAt", ""))
+                         or now - record.last_checked > RECHECK_AFTER)]
+        scraped = dict(zip(to_scrape, get_full_articles(
+            [listings[i]["url"] for i in to_scrape], session, deadline=deadline
+        )))
+
+        news: List[Dict[str, Any]] = []
+        for i, (listing, record) in enumerate(zip(listings, stored)):
+            url = listing.get("url") or ""
+            headline = listing.get("title", "")
+            published_at = listing.get("publishedAt", "")
+            content = scraped.get(i) if url else NO_URL_MESSAGE
+
+            if record is not None and (content is None or scrape_failed(content)):
+                # Not re-scraped (or the scrape failed): reuse what the last run kept
+                status, condensed = "unchanged", record.condensed
+                if record.budget != tokens_per_story:
+                    condensed = condense_text(record.content, tokens_per_story, headline)
+                metrics.count("index.reused")
+            elif scrape_failed(content):
+                status, condensed = "new", content  # Not indexed, so it is retried next run
+            else:
+                fingerprint = simhash(content)
+                unchanged = (record is not None and hamming_distance(
+                    fingerprint, record.fingerprint) <= CHANGE_DISTANCE)
+                if unchanged and record.budget == tokens_per_story:
+                    status, condensed = "unchanged", record.condensed
+                else:
+                    status = "unchanged" if unchanged else ("changed" if record else "new")
+                    condensed = condense_text(content, tokens_per_story, headline)
+                index.store(url, headline, published_at, fingerprint, content, condensed,
+                            tokens_per_story, changed=not unchanged)
+                metrics.count(f"index.{status}")
+
+            news.append({**structure_article(listing, condensed), "status": status})
+
+        index.mark_seen([listing["url"] for listing in listings if listing.get("url")])
+        index.prune()
+
+    if new_only:
+        news = [article for article in news if article["status"] != "unchanged"]
+    return deduplicate(news)
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
@@ -0,0 +1,131 @@
+"""
+Pre-decoded store for the static audio assets in `public/`.
+
+The intro, outro and background music are decoded once, have their gain and fades applied,
+and are saved as raw 16-bit PCM in `.npy` files under `.cache/assets/`. Later episodes
+memory-map those files instead of running ffmpeg and pydub's level adjustments again.
+Entries are keyed by a hash of the source file and the processing settings, so editing an
+asset or changing its levels produces a new entry automatically. Loaded assets are also
+kept in memory, so a long-running process (see worker.py) maps each one only once.
+"""
+
+# Python standard libraries
+import hashlib
+import json
+import os
+import sys
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, NamedTuple, Tuple
+
+# 3rd party imports
+import numpy as np
+from pydub import AudioSegment
+
+# Local imports
+from cache import CACHE_ROOT, cache_bypassed
+import metrics
+
+ASSET_DIR: Path = CACHE_ROOT / "assets"
+ASSET_FORMAT_VERSION: int = 1  # Bump to invalidate stored assets after processing changes
+
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+_file_hashes_lock = threading.Lock()
+_loaded: Dict[str, "AudioAsset"] = {}
+
+
+class AudioAsset(NamedTuple):
+    """Processed PCM samples of a static asset, shaped (frames, channels)."""
+    samples: np.ndarray
+    frame_rate: int
+
+    @property
+    def channels(self) -> int:
+        """Number of audio channels."""
+        return self.samples.shape[1]
+
+    def to_segment(self) -> AudioSegment:
+        """Return the asset as a pydub AudioSegment."""
+        return AudioSegment(data=np.ascontiguousarray(self.samples).tobytes(), sample_width=2,
+                            frame_rate=self.frame_rate, channels=self.channels)
+
+
+def file_hash(path: str) -> str:
+    """Return the SHA-256 of a file, remembering it while the file is unchanged."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _file_hashes_lock:
+        if memo_key in _file_hashes:
+            return _file_hashes[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+
+    with _file_hashes_lock:
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+def _process(path: str, gain_db: float, fade_in_ms: int) -> AudioSegment:
+    """Decode an asset and apply the same pydub adjustments the mixer used to apply."""
+    metrics.count("ffmpeg.invocations")
+    segment: AudioSegment = AudioSegment.from_file(path)
+    if fade_in_ms:
+        segment = segment.fade_in(fade_in_ms)
+    if gain_db:
+        segment = segment + gain_db
+    return segment.set_sample_width(2)
+
+def load_asset(path: str, gain_db: float = 0.0, fade_in_ms: int = 0) -> AudioAsset:
+    """
+    Load a static asset as processed PCM, decoding it only if it isn't in the store yet.
+
+    Args:
+        path: Path to the source audio file
+        gain_db: Gain applied after the fade, in dB (e.g. -16)
+        fade_in_ms: Length of the fade-in applied to the start of the asset
+
+    Returns:
+        AudioAsset: Memory-mapped samples and their frame rate
+    """
+    key_source = json.dumps([ASSET_FORMAT_VERSION, file_hash(path), gain_db, fade_in_ms])
+    key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+    samples_path: Path = ASSET_DIR / f"{key}.npy"
+    info_path: Path = ASSET_DIR / f"{key}.json"
+    if key in _loaded:
+        return _loaded[key]
+
+    if not cache_bypassed():
+        try:
+            info = json.loads(info_path.read_text(encoding="utf-8"))
+            _loaded[key] = AudioAsset(np.load(samples_path, mmap_mode="r"), info["frame_rate"])
+            return _loaded[key]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    segment = _process(path, gain_db, fade_in_ms)
+    samples = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, segment.channels)
+    if cache_bypassed():
+        _loaded[key] = AudioAsset(samples, segment.frame_rate)
+        return _loaded[key]
+
+    # Write under temporary names so concurrent builds never expose partial files
+    ASSET_DIR.mkdir(parents=True, exist_ok=True)
+    temp_suffix = uuid.uuid4().hex
+    temp_samples_path = ASSET_DIR / f".{key}.{temp_suffix}.npy"
+    np.save(temp_samples_path, samples)
+    os.replace(temp_samples_path, samples_path)
+    temp_info_path = ASSET_DIR / f".{key}.{temp_suffix}.json"
+    temp_info_path.write_text(json.dumps({"frame_rate": segment.frame_rate, "source": path}),
+                              encoding="utf-8")
+    os.replace(temp_info_path, info_path)
+
+    _loaded[key] = AudioAsset(np.load(samples_path, mmap_mode="r"), segment.frame_rate)
+    return _loaded[key]
+
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
@@ -2,15 +2,80 @@
 Audio processing module for news podcast generation.
 Handles mixing of speech audio with intro/outro segments and background music,
 including file name sanitization and proper audio level adjustments.
+
+Besides the main MP3, the mix can be encoded into extra delivery renditions (MP3 tiers,
+Opus, HLS with fMP4 segments) in the same pass: the episode is mixed once and every block
+is teed to one ffmpeg process per rendition, so the renditions encode in parallel and each
+one costs only its own encoding time.
 """
 
 import os
+import queue
 import random
 import re
+import shutil
+import subprocess
 import sys
+import tempfile
+import threading
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List
+from itertools import chain
+from typing import Callable, Dict, Iterable, Optional, List, Sequence, Tuple, Union
+import uuid
+import numpy as np
 from pydub import AudioSegment
+from pydub.exceptions import CouldntEncodeError
+
+# Local imports
+from asset_store import load_asset
+from mixer import StreamingMixer, iter_chunks, mix_episode
+import metrics
+
+RENDITIONS_ENV: str = "PODCAST_RENDITIONS"
+ABORT_JOIN_TIMEOUT_S: float = 5.0  # How long an aborted TeeEncoder waits for its feeders
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """A delivery format the mix can be encoded to alongside the main MP3."""
+    name: str
+    file_name: str  # Main output file, relative to the renditions directory
+    codec_args: Tuple[str, ...]  # ffmpeg output options
+    segmented: bool = False  # HLS: a playlist plus segment files in the file's directory
+
+
+RENDITIONS: Dict[str, Rendition] = {rendition.name: rendition for rendition in [
+    Rendition("mp3-192", "mp3-192.mp3", ("-c:a", "libmp3lame", "-b:a", "192k")),
+    Rendition("mp3-128", "mp3-128.mp3", ("-c:a", "libmp3lame", "-b:a", "128k")),
+    Rendition("mp3-64", "mp3-64.mp3", ("-c:a", "libmp3lame", "-b:a", "64k", "-ac", "1")),
+    Rendition("opus", "episode.opus", ("-c:a", "libopus", "-b:a", "48k", "-ar", "48000")),
+    Rendition("hls", "hls/playlist.m3u8", (
+        "-c:a", "aac", "-b:a", "96k", "-f", "hls", "-hls_time", "6",
+        "-hls_playlist_type", "vod", "-hls_segment_type", "fmp4",
+    ), segmented=True),
+]}
+
+
+def get_renditions(names: Optional[Sequence[str]] = None) -> List[Rendition]:
+    """
+    Return the named renditions, or those listed in PODCAST_RENDITIONS (comma-separated).
+
+    Raises:
+        ValueError: If a rendition is unknown
+    """
+    if names is None:
+        names = [name.strip() for name in os.getenv(RENDITIONS_ENV, "").split(",")]
+    unknown = [name for name in names if name and name not in RENDITIONS]
+    if unknown:
+        raise ValueError(f"Unknown renditions: {', '.join(unknown)} "
+                         f"(available: {', '.join(RENDITIONS)})")
+    return [RENDITIONS[name] for name in dict.fromkeys(names) if name]
+
+def background_music_files() -> List[str]:
+    """Return the background music tracks available in public/."""
+    candidates = [f'public/background-music_{i}.mp3' for i in range(1, 6)]
+    return [path for path in candidates if os.path.exists(path)] or candidates
 
 def sanitize_filename(filename: str) -> str:
     """
@@ -63,57 +128,279 @@ def sanitize_filename(filename: str) -> str:
 
     return filename if filename else 'untitled.mp3'
 
-def generate_mixed_audio(speech_path: str,
+class StreamingEncoder:
+    """
+    A single long-lived ffmpeg process that encodes raw PCM written to it in chunks.
+
+    Use as a context manager; the file is complete once the block exits without error.
+    """
+
+    def __init__(self, output_path: str, frame_rate: int, channels: int,
+                 audio_format: str = "mp3",
+                 output_args: Optional[Sequence[str]] = None) -> None:
+        self.output_path: str = output_path
+        self._stderr = tempfile.TemporaryFile()
+        command: List[str] = [
+            AudioSegment.converter, "-y", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(frame_rate), "-ac", str(channels), "-i", "pipe:0",
+            *(output_args if output_args is not None else ["-f", audio_format]), output_path
+        ]
+        metrics.count("ffmpeg.invocations")
+        try:
+            # Owned by the encoder; close() or __exit__ waits for it
+            self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+                command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        except BaseException:
+            self._stderr.close()
+            raise
+
+    def write(self, samples: np.ndarray) -> None:
+        """Send a block of int16 (frames, channels) samples to the encoder."""
+        self.write_raw(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+
+    def write_raw(self, data: bytes) -> None:
+        """Send interleaved 16-bit PCM bytes to the encoder."""
+        self._process.stdin.write(data)
+
+    def close(self) -> None:
+        """Finish encoding and raise if ffmpeg failed."""
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg already exited; its return code says why
+        return_code = self._process.wait()
+        self._stderr.seek(0)
+        error_output = self._stderr.read().decode(errors="ignore")
+        self._stderr.close()
+        if return_code != 0:
+            raise CouldntEncodeError(
+                f"Encoding failed. ffmpeg returned error code: {return_code}\n\n{error_output}"
+            )
+
+    def __enter__(self) -> "StreamingEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._process.kill()
+            self._process.wait()
+            self._stderr.close()
+
+    @classmethod
+    def for_rendition(cls, rendition: Rendition, directory: str, frame_rate: int,
+                      channels: int) -> "StreamingEncoder":
+        """Start an encoder writing `rendition` into `directory`."""
+        output_path = os.path.join(directory, rendition.file_name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        output_args: List[str] = list(rendition.codec_args)
+        if rendition.segmented:
+            output_args += ["-hls_segment_filename",
+                            os.path.join(os.path.dirname(output_path), "segment_%03d.m4s")]
+        return cls(output_path, frame_rate, channels, output_args=output_args)
+
+class TeeEncoder:
+    """
+    Sends the same PCM to several StreamingEncoders, whose ffmpeg processes encode it in
+    parallel. Use as a context manager; every output is complete once the block exits.
+
+    Each encoder is fed by its own thread from a short queue, so a slow encoder (e.g. AAC)
+    doesn't hold up the others or the mixer until its queue is full.
+    """
+
+    def __init__(self, encoders: List[StreamingEncoder], max_pending: int = 16) -> None:
+        self.encoders: List[StreamingEncoder] = encoders
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=max_pending) for _ in encoders]
+        self._errors: List[BaseException] = []
+        self._aborted: bool = False
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._feed, args=(encoder, blocks), daemon=True)
+            for encoder, blocks in zip(encoders, self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _feed(self, encoder: StreamingEncoder, blocks: queue.Queue) -> None:
+        alive = True
+        while (data := blocks.get()) is not None:
+            if not alive or self._aborted:
+                continue  # Keep draining so write() never blocks on a dead encoder
+            try:
+                encoder.write_raw(data)
+            except (OSError, ValueError):
+                # ffmpeg exited early, or __exit__ killed it; closing it reports why
+                alive = False
+                self._close(encoder)
+        if alive:
+            self._close(encoder)
+
+    def _close(self, encoder: StreamingEncoder) -> None:
+        # After an abort __exit__ has already killed the encoder and closed its stderr
+        if self._aborted:
+            return
+        try:
+            encoder.close()
+        except (CouldntEncodeError, OSError, ValueError) as error:
+            if not self._aborted:
+                self._errors.append(error)
+
+    def write(self, samples: np.ndarray) -> None:
+        """Queue a block of int16 (frames, channels) samples for every encoder."""
+        if self._errors:
+            raise self._errors[0]
+        data = np.ascontiguousarray(samples, dtype=np.int16).tobytes()
+        for blocks in self._queues:
+            blocks.put(data)
+
+    def __enter__(self) -> "TeeEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            # Each feeder closes its own encoder once its queue is drained
+            for blocks in self._queues:
+                blocks.put(None)
+            for thread in self._threads:
+                thread.join()
+            if self._errors:
+                raise self._errors[0]
+            return
+        # Kill the encoders first so feeders blocked on a full pipe return, then drop the
+        # pending blocks so the stop marker fits; a feeder that still hangs is a daemon
+        self._aborted = True
+        for encoder in self.encoders:
+            encoder.__exit__(exc_type, exc_value, traceback)
+        for blocks in self._queues:
+            while True:
+                try:
+                    blocks.get_nowait()
+                except queue.Empty:
+                    break
+            blocks.put_nowait(None)
+        for thread in self._threads:
+            thread.join(timeout=ABORT_JOIN_TIMEOUT_S)
+
+def mix_to_file(speech: Union[str, AudioSegment, Iterable[AudioSegment]],
+                output_path: str,
+                intro_path: str = "public/news-intro.mp3",
+                bgm_path: Optional[str] = None,
+                outro_path: str = "public/news-outro.mp3",
+                streaming: bool = True,
+                renditions: Sequence[Rendition] = (),
+                renditions_dir: Optional[str] = None) -> str:
+    """
+    Mix speech with intro, outro, and background music and encode it to `output_path`.
+
+    See `generate_mixed_audio` for the accepted kinds of `speech` and for `streaming`.
+    Each of `renditions` is encoded into `renditions_dir` from the same mix, in parallel
+    with the main MP3 (this always uses the streaming mixer).
+    """
+    if bgm_path is None:
+        bgm_path = random.choice(background_music_files())
+
+    # Load audio; static assets come pre-decoded with their levels already adjusted
+    if isinstance(speech, str):
+        metrics.count("ffmpeg.invocations")
+        speech = AudioSegment.from_file(speech)
+    intro = load_asset(intro_path, gain_db=-16)  # Reduced from -10
+    bgm = load_asset(bgm_path, gain_db=-26, fade_in_ms=1000)  # Reduced from -20
+    outro = load_asset(outro_path, gain_db=-16)  # Reduced from -10
+
+    # Loop the background music under the speech and add the intro and outro
+    if isinstance(speech, AudioSegment) and not streaming and not renditions:
+        final_audio = mix_episode(speech, bgm, intro, outro)
+        metrics.count("ffmpeg.invocations")
+        final_audio.export(output_path, format="mp3")
+    else:
+        chunks = iter_chunks(speech) if isinstance(speech, AudioSegment) else iter(speech)
+        first_chunk = next(chunks, AudioSegment.silent(duration=0, frame_rate=24000))
+        mixer = StreamingMixer(bgm, intro, outro, first_chunk.frame_rate, first_chunk.channels)
+        encoders: List[StreamingEncoder] = []
+        try:
+            encoders.append(StreamingEncoder(output_path, mixer.frame_rate, mixer.channels))
+            for rendition in renditions:
+                encoders.append(StreamingEncoder.for_rendition(
+                    rendition, renditions_dir or ".", mixer.frame_rate, mixer.channels))
+            tee = TeeEncoder(encoders)
+        except BaseException:
+            # Kill the ffmpeg processes that did start, rather than leave them waiting for input
+            for started in encoders:
+                started.__exit__(*sys.exc_info())
+            raise
+        with tee as encoder:
+            for block in mixer.mix(chain([first_chunk], chunks)):
+                encoder.write(block)
+    return output_path
+
+def publish_episode(audio_path: str, title: str, timestamp: Optional[str] = None,
+                    move: bool = True) -> str:
+    """
+    Put an encoded episode into 'clips' under its title and return the new path.
+
+    The file is moved unless `move` is False, in which case it is copied.
+    """
+    clips_dir = os.path.join(os.path.dirname(__file__), 'clips')
+    os.makedirs(clips_dir, exist_ok=True)
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    output_path = os.path.join(clips_dir, f"{sanitize_filename(title)}_{timestamp}.mp3")
+    # Episodes finished in the same second (e.g. by parallel jobs) must not overwrite each other
+    copy_number: int = 1
+    while os.path.exists(output_path):
+        copy_number += 1
+        output_path = os.path.join(clips_dir,
+                                   f"{sanitize_filename(title)}_{timestamp}_{copy_number}.mp3")
+    if move:
+        os.replace(audio_path, output_path)
+    else:
+        shutil.copyfile(audio_path, output_path)
+    return output_path
+
+def publish_renditions(renditions_dir: str, files: Dict[str, str],
+                       episode_path: str) -> Dict[str, str]:
+    """
+    Copy encoded renditions next to a published episode and return their new paths.
+
+    They go into a directory named after the episode file, e.g. 'clips/<title>_<time>/'.
+    `files` maps each rendition's name to its file in `renditions_dir`.
+    """
+    target_dir = os.path.splitext(episode_path)[0]
+    shutil.copytree(renditions_dir, target_dir, dirs_exist_ok=True)
+    return {name: os.path.join(target_dir, file_name) for name, file_name in files.items()}
+
+def generate_mixed_audio(speech: Union[str, AudioSegment, Iterable[AudioSegment]],
                          intro_path: str = "public/news-intro.mp3",
                          bgm_path: Optional[str] = None,
                          outro_path: str = "public/news-outro.mp3",
-                         title: str = "The Rundown News") -> str:
+                         title: Union[str, Callable[[], str]] = "The Rundown News",
+                         streaming: bool = True) -> str:
     """
     Generate the final podcast audio by mixing speech with intro, outro, and background music.
+
+    `speech` may be a path to an audio file or an in-memory AudioSegment (e.g. from
+    `gen_speech(..., as_segment=True)`), which avoids decoding the speech again.
+    It may also be an iterable of AudioSegments (e.g. from `tts.iter_speech`); each piece
+    is mixed and encoded as it arrives, so mixing overlaps with synthesis.
+    With `streaming` (the default) the mix is produced in fixed-size blocks and piped into
+    one ffmpeg process, so the finished episode is never held in memory as a whole.
+    `title` may be a callable; it is only called once the audio is encoded, which lets the
+    headline be generated while the episode is being mixed.
     """
-    if bgm_path is None:
-        bgm_files = [f'public/background-music_{i}.mp3' for i in range(1, 6)]
-        bgm_path = random.choice(bgm_files)
-
-    # Load audio segments
-    audio_segments = {
-        'intro': AudioSegment.from_file(intro_path),
-        'speech': AudioSegment.from_file(speech_path),
-        'bgm': AudioSegment.from_file(bgm_path),
-        'outro': AudioSegment.from_file(outro_path)
-    }
-
-    # Adjust volume levels
-    audio_segments['bgm'] = audio_segments['bgm'].fade_in(1000) - 26  # Reduced from -20
-    audio_segments['intro'] -= 16  # Reduced from -10
-    audio_segments['outro'] -= 16  # Reduced from -10
-
-    # Create looped background music
-    bgm_loop = AudioSegment.silent(duration=0)
-    segment_duration = len(audio_segments['bgm']) - 3000
-
-    while len(bgm_loop) < len(audio_segments['speech']):
-        segment = audio_segments['bgm'][:segment_duration].fade_out(1500).fade_in(1500)
-        bgm_loop += segment
-
-    bgm_loop = bgm_loop[:len(audio_segments['speech'])]
-    fade_out_duration = min(10000, len(bgm_loop))
-    bgm_loop = bgm_loop.fade_out(fade_out_duration)
-
-    # Mix audio
-    mixed_audio = audio_segments['speech'].overlay(bgm_loop)
-    final_audio = audio_segments['intro'] + mixed_audio + audio_segments['outro']
-
-    # Export final audio
+    # Export to a temporary name in clips; it is renamed once the title is known
     clips_dir = os.path.join(os.path.dirname(__file__), 'clips')
     os.makedirs(clips_dir, exist_ok=True)
-    output_path = os.path.join(
-        clips_dir,
-        f"{sanitize_filename(title)}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.mp3"
-    )
-    final_audio.export(output_path, format="mp3")
-
-    return output_path
+    timestamp: str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    partial_path = os.path.join(clips_dir, f".{uuid.uuid4()}.partial.mp3")
+    try:
+        mix_to_file(speech, partial_path, intro_path, bgm_path, outro_path, streaming)
+        if callable(title):
+            title = title()
+        return publish_episode(partial_path, title, timestamp)
+    except BaseException:
+        # Don't leave a half-written episode behind in clips
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
 
 if __name__ == "__main__":
     print("This script is not meant to be run directly. Run main.py instead.")
@@ -0,0 +1,200 @@
+"""
+Batch mode: produce several editions of the podcast from a single news fetch.
+
+Each edition is a (country, voice, language) combination. Articles are fetched once per
+country and the static audio assets are decoded once, then shared by every edition.
+Script writing, speech synthesis and mixing run concurrently with a separate limit for
+each stage; mixing runs in a process pool because it is CPU-bound. Every edition works in
+its own subdirectory of the batch's leased scratch directory, so parallel editions (and
+other runs) never delete each other's files.
+
+A JSON report of the whole batch (see metrics.py) is written to `reports/`.
+
+Usage:
+    python batch.py --edition us:nova:English --edition gb:onyx:English --edition us:sage:Spanish
+    python batch.py --editions editions.json   # [{"country": "us", "voice": "nova", ...}]
+"""
+
+# Python standard libraries
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 3rd party imports
+from pydub import AudioSegment
+
+# Local imports
+import metrics
+from terminal import Item, spinner
+from article_index import fetch_indexed_news
+from ai_script_writer import write_script
+from translate import translate_text
+from tts import gen_speech
+from audio_merge import background_music_files, generate_mixed_audio
+from asset_store import load_asset
+from scratch import ScratchDir
+
+
+@dataclass(frozen=True)
+class Edition:
+    """One version of the episode: which country's news, read by which host, in which language."""
+    country: str = "us"
+    voice: str = "nova"
+    language: str = "English"
+
+    @property
+    def name(self) -> str:
+        """Short identifier, e.g. 'us-nova-english'."""
+        return f"{self.country}-{self.voice}-{self.language}".lower().replace(" ", "_")
+
+    @classmethod
+    def parse(cls, spec: str) -> "Edition":
+        """Parse 'country:voice:language' (voice and language are optional)."""
+        return cls(*[part for part in spec.split(":") if part])
+
+
+@dataclass
+class EditionResult:
+    """Outcome of producing one edition."""
+    edition: Edition
+    audio_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+def mix_edition(speech_path: str, title: str, bgm_path: str) -> str:
+    """Mix and encode one edition. Runs in a worker process."""
+    return generate_mixed_audio(AudioSegment.from_wav(speech_path), bgm_path=bgm_path,
+                                title=title)
+
+def produce_edition(edition: Edition,
+                    news: List[Dict[str, Any]],
+                    work_dir: Path,
+                    llm_limit: threading.Semaphore,
+                    tts_limit: threading.Semaphore,
+                    mix_pool: ProcessPoolExecutor) -> str:
+    """Write, translate, synthesize and mix one edition and return the audio path."""
+    with llm_limit:
+        script, voice, headline = write_script(news, voice=edition.voice)
+        if edition.language.lower() not in ("english", "en"):
+            script = translate_text(script, edition.language)
+
+    with tts_limit:
+        speech: AudioSegment = gen_speech(script, voice, as_segment=True)
+
+    # Hand the speech to the mixing process through this edition's own directory
+    speech_path = work_dir / "speech.wav"
+    speech.export(speech_path, format="wav")
+    del speech
+    title = f"{headline.capitalize()} ({edition.country.upper()}, {edition.language})"
+    return mix_pool.submit(mix_edition, str(speech_path), title,
+                           random.choice(background_music_files())).result()
+
+def run_batch(editions: List[Edition],
+              max_articles: int = 5,
+              llm_workers: int = 4,
+              tts_workers: int = 2,
+              mix_workers: Optional[int] = None) -> List[EditionResult]:
+    """
+    Produce every edition, sharing fetched news and decoded assets between them.
+
+    Args:
+        editions: The editions to produce
+        max_articles: Articles per episode
+        llm_workers: Editions allowed to write/translate their script at the same time
+        tts_workers: Editions allowed to synthesize speech at the same time
+        mix_workers: Processes used for mixing (defaults to the number of CPUs)
+
+    Returns:
+        List[EditionResult]: One result per edition, in the same order
+    """
+    with spinner("Fetching news...", "News fetched!"):
+        countries = sorted({edition.country for edition in editions})
+        with ThreadPoolExecutor(max_workers=len(countries)) as executor:
+            fetched = executor.map(
+                lambda c: fetch_indexed_news(country=c, max_articles=max_articles), countries
+            )
+            news_by_country: Dict[str, List[Dict[str, Any]]] = dict(zip(countries, fetched))
+
+    # Decode the static assets once; the mixing processes memory-map the stored copies
+    with spinner("Preparing audio assets...", "Audio assets ready!"):
+        load_asset("public/news-intro.mp3", gain_db=-16)
+        load_asset("public/news-outro.mp3", gain_db=-16)
+        for bgm_path in background_music_files():
+            load_asset(bgm_path, gain_db=-26, fade_in_ms=1000)
+
+    llm_limit = threading.Semaphore(llm_workers)
+    tts_limit = threading.Semaphore(tts_workers)
+    results: List[EditionResult] = []
+
+    # The scratch directory is leased to this batch and removed when it finishes. Mixing
+    # processes are spawned rather than forked: the pool starts them while the coordinator's
+    # threads hold locks (logging, HTTP connection pools), which a forked child would inherit
+    with ScratchDir(prefix="batch") as scratch, \
+            spinner(f"Producing {len(editions)} editions...", "Editions produced!"), \
+            ProcessPoolExecutor(max_workers=mix_workers,
+                                mp_context=multiprocessing.get_context("spawn")) as mix_pool, \
+            ThreadPoolExecutor(max_workers=len(editions)) as coordinator:
+        futures: List[Future] = []
+        for index, edition in enumerate(editions):
+            futures.append(coordinator.submit(
+                produce_edition, edition, news_by_country[edition.country],
+                scratch.subdir(f"{index}-{edition.name}"), llm_limit, tts_limit, mix_pool
+            ))
+
+        for edition, future in zip(editions, futures):
+            try:
+                results.append(EditionResult(edition, audio_path=future.result()))
+            except Exception as e:  # pylint: disable=broad-except
+                results.append(EditionResult(edition, error=f"{type(e).__name__}: {e}"))
+
+    return results
+
+def load_editions(path: str) -> List[Edition]:
+    """Read editions from a JSON list of {"country", "voice", "language"} objects."""
+    with open(path, encoding="utf-8") as file:
+        return [Edition(**entry) for entry in json.load(file)]
+
+def main() -> None:
+    """Parse arguments, produce the editions and print where they were saved."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--edition", action="append", default=[], metavar="COUNTRY:VOICE:LANGUAGE",
+                        help="An edition to produce (repeatable)")
+    parser.add_argument("--editions", metavar="FILE", help="JSON file listing editions")
+    parser.add_argument("--max-articles", type=int, default=5)
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--tts-workers", type=int, default=2)
+    parser.add_argument("--mix-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    editions = [Edition.parse(spec) for spec in args.edition]
+    if args.editions:
+        editions += load_editions(args.editions)
+    if not editions:
+        parser.error("no editions given; use --edition or --editions")
+
+    # One report covers the whole batch; mixing processes don't add to its counters
+    with metrics.recorded_run() as report:
+        results = run_batch(editions, args.max_articles, args.llm_workers, args.tts_workers,
+                            args.mix_workers)
+        failed = [result.edition.name for result in results if result.error]
+        if failed:
+            report.error = f"Editions failed: {', '.join(failed)}"
+    for result in results:
+        if result.error:
+            Item.failed(f"{result.edition.name}: {result.error}", indent=False)
+        else:
+            Item.checked(f"{result.edition.name}: '{result.audio_path}'", indent=False)
+    if any(result.error for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
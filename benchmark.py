@@ -0,0 +1,357 @@
+"""
+Offline benchmark suite for the news podcast maker.
+
+Runs `fetch_news`, `write_script`, `gen_speech` and `generate_mixed_audio` against the local
+stand-ins in mock_services.py, across several article counts and episode lengths, and
+reports latency percentiles and throughput. Results can be stored as a baseline and later
+runs compared against it to catch regressions; every run is appended to
+`benchmarks/history.jsonl`.
+
+The `extract` command compares the HTML article extractors on the pages saved in
+`benchmarks/corpus/` (or on generated pages when the corpus is empty).
+
+The `startup` command measures the cold start of the CLI's lightweight commands with
+`python -X importtime`. It fails if one of them imports a heavy dependency (openai, pydub,
+BeautifulSoup, ...) or, like the other commands, gets slower than the baseline allows.
+
+Usage:
+    python benchmark.py                          # Run the default matrix
+    python benchmark.py --save-baseline          # Store the results as the new baseline
+    python benchmark.py --articles 3,10 --lengths short,long --repeat 5 --latency 100
+    python benchmark.py extract --save-corpus https://example.com/news/story.html
+    python benchmark.py --repeat 20 extract
+    python benchmark.py --save-baseline startup
+"""
+
+# Python standard libraries
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Local imports
+from mock_services import MockConfig, MockServer, article_page
+
+BENCHMARKS_DIR: Path = Path(__file__).parent / "benchmarks"
+BASELINE_PATH: Path = BENCHMARKS_DIR / "baseline.json"
+HISTORY_PATH: Path = BENCHMARKS_DIR / "history.jsonl"
+CORPUS_DIR: Path = BENCHMARKS_DIR / "corpus"
+EPISODE_LENGTHS: Dict[str, int] = {"short": 5, "medium": 15, "long": 40}  # Script paragraphs
+STAGES: List[str] = ["fetch", "script", "speech", "mix"]
+DEFAULT_REPEATS: Dict[Optional[str], int] = {None: 3, "extract": 10, "startup": 10}
+STARTUP_COMMANDS: Dict[str, List[str]] = {
+    "import main": ["-c", "import main"],
+    "main status": ["main.py", "status"],
+    "main inspect": ["main.py", "inspect", "startup-benchmark"],
+    "main dry-run": ["main.py", "dry-run"],
+}
+# Modules that only the stages doing the actual work may import
+HEAVY_MODULES: List[str] = ["openai", "httpx", "pydantic", "pydub", "numpy", "bs4", "lxml",
+                            "requests", "tiktoken"]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the `fraction` percentile of `values` using linear interpolation."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(timings: List[float], work: float, unit: str) -> Dict[str, Any]:
+    """Summarize repeated timings of a task that processes `work` units each time."""
+    mean = sum(timings) / len(timings)
+    return {
+        "runs": len(timings),
+        "mean": round(mean, 4),
+        "min": round(min(timings), 4),
+        "p50": round(percentile(timings, 0.5), 4),
+        "p90": round(percentile(timings, 0.9), 4),
+        "p99": round(percentile(timings, 0.99), 4),
+        "max": round(max(timings), 4),
+        "throughput": round(work / mean, 3) if mean else None,
+        "unit": f"{unit}/s",
+    }
+
+def measure(task: Callable[[], Any], repeat: int) -> Tuple[List[float], Any]:
+    """Run `task` `repeat` times and return the timings and the last result."""
+    timings: List[float] = []
+    result: Any = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = task()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+def point_environment_at(server: MockServer) -> None:
+    """Route the pipeline's API calls to the mock server and disable caching."""
+    os.environ["NEWS_API_URL"] = f"{server.base_url}/v2/top-headlines"
+    os.environ["NEWS_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"{server.base_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["PODCAST_NO_CACHE"] = "1"
+
+def run_pipeline_benchmarks(articles: List[int], lengths: List[str], stages: List[str],
+                            repeat: int, config: MockConfig) -> Dict[str, Dict[str, Any]]:
+    """Benchmark each requested stage and return summaries keyed by scenario name."""
+    server = MockServer(config).start()
+    point_environment_at(server)
+
+    # Imported here so the modules pick up the mock endpoints from the environment
+    from news_fetcher import fetch_news  # pylint: disable=import-outside-toplevel
+    from ai_script_writer import write_script  # pylint: disable=import-outside-toplevel
+    from tts import gen_speech  # pylint: disable=import-outside-toplevel
+    from audio_merge import generate_mixed_audio  # pylint: disable=import-outside-toplevel
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for article_count in articles:
+            config.article_count = article_count
+            news = fetch_news(max_articles=article_count - 1, use_cache=False)
+            if "fetch" in stages:
+                timings, _ = measure(
+                    partial(fetch_news, max_articles=article_count - 1, use_cache=False), repeat)
+                results[f"fetch/articles={article_count}"] = summarize(
+                    timings, article_count, "articles")
+
+            for length in lengths:
+                config.script_paragraphs = EPISODE_LENGTHS[length]
+                if "script" in stages:
+                    timings, _ = measure(partial(write_script, news), repeat)
+                    results[f"script/articles={article_count}/length={length}"] = summarize(
+                        timings, EPISODE_LENGTHS[length], "paragraphs")
+
+        for length in lengths:
+            config.script_paragraphs = EPISODE_LENGTHS[length]
+            script, voice, _ = write_script(news)
+            speech = gen_speech(script, voice, use_cache=False, as_segment=True)
+            if "speech" in stages:
+                timings, speech = measure(
+                    partial(gen_speech, script, voice, use_cache=False, as_segment=True), repeat)
+                results[f"speech/length={length}"] = summarize(
+                    timings, len(speech) / 1000, "audio seconds")
+
+            if "mix" in stages:
+                if shutil.which("ffmpeg") is None:
+                    print("Skipping mix benchmark: ffmpeg not found")
+                    continue
+
+                def mix(speech: Any) -> None:
+                    path = generate_mixed_audio(speech, bgm_path="public/background-music_2.mp3",
+                                                title="benchmark")
+                    os.remove(path)
+                timings, _ = measure(partial(mix, speech), repeat)
+                results[f"mix/length={length}"] = summarize(
+                    timings, len(speech) / 1000, "audio seconds")
+    finally:
+        server.stop()
+    return results
+
+def save_corpus(urls: List[str]) -> None:
+    """Download article pages into the extraction corpus."""
+    from news_fetcher import create_session  # pylint: disable=import-outside-toplevel
+
+    CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+    session = create_session()
+    for url in urls:
+        response = session.get(url, timeout=10)
+        response.raise_for_status()
+        path = CORPUS_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.html"
+        path.write_text(response.text, encoding="utf-8")
+        print(f"Saved {url} -> '{path}' ({len(response.text) / 1024:.0f} KiB)")
+
+def load_corpus() -> Tuple[List[str], str]:
+    """Return the saved corpus pages, or generated pages if there are none, and their origin."""
+    pages = [path.read_text(encoding="utf-8") for path in sorted(CORPUS_DIR.glob("*.html"))]
+    if pages:
+        return pages, str(CORPUS_DIR)
+    return [article_page(seed, 20, 80) for seed in range(25)], "generated"
+
+def run_extraction_benchmarks(repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Benchmark every available article extractor over the corpus."""
+    from article_extractor import EXTRACTORS, get_extractor  # pylint: disable=import-outside-toplevel
+
+    pages, origin = load_corpus()
+    megabytes = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    print(f"Corpus: {len(pages)} pages, {megabytes:.2f} MB ({origin})")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in EXTRACTORS:
+        extractor = get_extractor(name)
+        timings, texts = measure(lambda e=extractor: [e.extract(page) for page in pages], repeat)
+        summary = summarize(timings, len(pages), "pages")
+        summary["output_chars"] = sum(len(text) for text in texts)
+        results[f"extract/{name}"] = summary
+    for name, summary in results.items():
+        print(f"{name}: {summary['output_chars']} characters of text kept")
+    return results
+
+def parse_importtime(stderr: str) -> Tuple[float, List[str]]:
+    """Return the total import time (seconds) and the imported modules from -X importtime."""
+    total_us: int = 0
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.append(name.strip())
+        if not name.startswith("  "):  # Top-level imports include their children
+            total_us += int(cumulative)
+    return total_us / 1e6, modules
+
+def start_command(command: List[str], env: Dict[str, str],
+                  samples: List[Tuple[float, List[str]]]) -> None:
+    """Run a CLI command once and add its import time and imported modules to `samples`."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", *command],
+                               capture_output=True, text=True, env=env, check=False,
+                               cwd=Path(__file__).parent)
+    samples.append(parse_importtime(completed.stderr))
+
+def run_startup_benchmarks(repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Time cold starts of the lightweight CLI commands and record what they import."""
+    # A throwaway run for `inspect` to read; it is removed afterwards
+    from pipeline import RUNS_DIR, PipelineRun  # pylint: disable=import-outside-toplevel
+
+    run_dir = RUNS_DIR / "startup-benchmark"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    PipelineRun("startup-benchmark", {"run_id": "startup-benchmark", "created": time.time(),
+                                      "params": {"country": "us"}, "stages": {}}).save()
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPROFILEIMPORTTIME"}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for name, command in STARTUP_COMMANDS.items():
+            samples: List[Tuple[float, List[str]]] = []
+            timings, _ = measure(partial(start_command, command, env, samples), repeat)
+            modules = samples[-1][1]
+            summary = summarize(timings, 1, "starts")
+            import_seconds = [seconds for seconds, _ in samples]
+            summary["import_seconds"] = round(percentile(import_seconds, 0.5), 4)
+            summary["modules"] = len(modules)
+            summary["heavy_imports"] = sorted({module.split(".")[0] for module in modules}
+                                              .intersection(HEAVY_MODULES))
+            results[f"startup/{name}"] = summary
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    for name, summary in results.items():
+        print(f"{name}: {summary['modules']} modules, {summary['import_seconds'] * 1000:.1f} ms "
+              f"importing")
+    return results
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    """Return a description of every scenario whose median got slower than allowed."""
+    regressions: List[str] = []
+    for name, summary in results.items():
+        if name not in baseline or not baseline[name].get("p50"):
+            continue
+        ratio = summary["p50"] / baseline[name]["p50"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: p50 {baseline[name]['p50']:.4f}s -> "
+                               f"{summary['p50']:.4f}s ({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+def git_revision() -> str:
+    """Return the current commit hash, or 'unknown' outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    """Print a results table."""
+    print(f"{'scenario':<36} {'p50':>8} {'p90':>8} {'p99':>8} {'throughput':>24}")
+    for name, summary in results.items():
+        print(f"{name:<36} {summary['p50']:>8.3f} {summary['p90']:>8.3f} {summary['p99']:>8.3f} "
+              f"{summary['throughput']:>10} {summary['unit']:<13}")
+
+def main() -> None:
+    """Parse arguments, run the benchmarks and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--articles", default="3,6,11",
+                        help="Comma-separated article counts (NewsAPI page sizes)")
+    parser.add_argument("--lengths", default="short,medium,long",
+                        help=f"Comma-separated episode lengths ({', '.join(EPISODE_LENGTHS)})")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"Comma-separated stages to measure ({', '.join(STAGES)})")
+    parser.add_argument("--repeat", type=int,
+                        help="Runs per scenario (default: 3), passes over the corpus for "
+                             "`extract` or starts per command for `startup` (default: 10)")
+    parser.add_argument("--latency", type=float, default=50.0,
+                        help="Mock service latency in milliseconds")
+    parser.add_argument("--paragraph-words", type=int, default=60,
+                        help="Words per article/script paragraph (payload size)")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed p50 slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store these results as the new baseline")
+    commands = parser.add_subparsers(dest="command")
+    extract_parser = commands.add_parser("extract", help="Benchmark the HTML article extractors")
+    extract_parser.add_argument("--save-corpus", nargs="+", metavar="URL",
+                                help="Download these pages into the corpus first")
+    commands.add_parser("startup", help="Benchmark the cold start of the CLI commands")
+    args = parser.parse_args()
+    repeat: int = args.repeat or DEFAULT_REPEATS[args.command]
+
+    if args.command == "startup":
+        config = {"python": sys.version.split()[0]}
+        results = run_startup_benchmarks(repeat)
+    elif args.command == "extract":
+        if args.save_corpus:
+            save_corpus(args.save_corpus)
+        config: Any = {"corpus": str(CORPUS_DIR)}
+        results = run_extraction_benchmarks(repeat)
+    else:
+        config = MockConfig(latency_ms=args.latency, words_per_paragraph=args.paragraph_words)
+        results = run_pipeline_benchmarks(
+            articles=[int(count) for count in args.articles.split(",")],
+            lengths=args.lengths.split(","),
+            stages=args.stages.split(","),
+            repeat=repeat,
+            config=config,
+        )
+        config = vars(config)
+    print_results(results)
+
+    # Heavy imports in the lightweight commands are a regression whatever the baseline says
+    heavy = [f"{name}: imports {', '.join(summary['heavy_imports'])}"
+             for name, summary in results.items() if summary.get("heavy_imports")]
+    for regression in heavy:
+        print(f"REGRESSION {regression}")
+
+    BENCHMARKS_DIR.mkdir(exist_ok=True)
+    with open(HISTORY_PATH, "a", encoding="utf-8") as history:
+        history.write(json.dumps({"time": time.time(), "revision": git_revision(),
+                                  "config": config, "results": results}) + "\n")
+    if heavy:
+        sys.exit(1)
+
+    if args.save_baseline:
+        # Scenarios that were not run this time keep their stored baseline
+        baseline: Dict[str, Any] = {}
+        if BASELINE_PATH.exists():
+            baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2), encoding="utf-8")
+        print(f"Baseline saved to '{BASELINE_PATH}'")
+    elif BASELINE_PATH.exists():
+        regressions = compare(results, json.loads(BASELINE_PATH.read_text(encoding="utf-8")),
+                              args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
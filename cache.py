@@ -0,0 +1,177 @@
+"""
+Persistent on-disk caches shared by the podcast pipeline stages.
+
+Entries live under `.cache/<namespace>/` as a data file plus a small JSON metadata file.
+Each namespace is bounded in size and evicts its least recently used entries first.
+Setting the PODCAST_NO_CACHE environment variable bypasses every cache.
+"""
+
+# Python standard libraries
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+CACHE_ROOT: Path = Path(__file__).parent / ".cache"
+BYPASS_ENV: str = "PODCAST_NO_CACHE"
+
+
+def cache_bypassed() -> bool:
+    """Return True if caching has been disabled through the environment."""
+    return os.getenv(BYPASS_ENV, "").lower() not in ("", "0", "false", "no")
+
+
+class CacheEntry(NamedTuple):
+    """A cached value together with its metadata and freshness."""
+    data: bytes
+    meta: Dict[str, Any]
+    fresh: bool
+
+
+class DiskCache:
+    """Size-bounded LRU cache that stores bytes on disk with optional expiry times."""
+
+    def __init__(self,
+                 namespace: str,
+                 max_bytes: int = 256 * 1024 * 1024,
+                 default_ttl: Optional[float] = None,
+                 enabled: Optional[bool] = None) -> None:
+        """
+        Args:
+            namespace: Name of the subdirectory of `.cache` that holds the entries
+            max_bytes: Total size of the data files before old entries are evicted
+            default_ttl: Seconds an entry stays fresh, or None to never expire
+            enabled: Force the cache on or off (defaults to on unless bypassed)
+        """
+        self.directory: Path = CACHE_ROOT / namespace
+        self.max_bytes: int = max_bytes
+        self.default_ttl: Optional[float] = default_ttl
+        self.enabled: bool = (not cache_bypassed()) if enabled is None else enabled
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash arbitrary JSON-serializable parts into a cache key."""
+        payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.bin", self.directory / f"{key}.json"
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for `key`, including expired ones, or None if it is missing."""
+        if not self.enabled:
+            return None
+        data_path, meta_path = self._paths(key)
+        try:
+            meta: Dict[str, Any] = json.loads(meta_path.read_text(encoding="utf-8"))
+            data: bytes = data_path.read_bytes()
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        expires: Optional[float] = meta.get("expires")
+        fresh: bool = expires is None or expires > time.time()
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        try:
+            os.utime(data_path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return CacheEntry(data, meta.get("meta", {}), fresh)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for `key` if present and not expired."""
+        entry = self.lookup(key)
+        return entry.data if entry is not None and entry.fresh else None
+
+    def set(self, key: str, data: bytes, meta: Optional[Dict[str, Any]] = None,
+            ttl: Optional[float] = None) -> None:
+        """Store `data` under `key`, evicting old entries if the cache grows too large."""
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+        self._write_atomic(data_path, data)
+        self._write_meta(meta_path, meta or {}, ttl if ttl is not None else self.default_ttl)
+        self._evict()
+
+    def touch(self, key: str, ttl: Optional[float] = None) -> None:
+        """Give an existing entry a new expiry time, e.g. after successful revalidation."""
+        entry = self.lookup(key)
+        if entry is not None:
+            _, meta_path = self._paths(key)
+            self._write_meta(meta_path, entry.meta, ttl if ttl is not None else self.default_ttl)
+
+    def delete(self, key: str) -> None:
+        """Remove the entry for `key` if it exists."""
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove every entry in this namespace."""
+        if not self.directory.exists():
+            return
+        for path in self.directory.iterdir():
+            if path.is_file():
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters along with the current number and size of entries."""
+        files = list(self.directory.glob("*.bin")) if self.directory.exists() else []
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(files),
+            "bytes": sum(path.stat().st_size for path in files if path.exists()),
+        }
+
+    def _write_meta(self, meta_path: Path, meta: Dict[str, Any], ttl: Optional[float]) -> None:
+        record = {
+            "created": time.time(),
+            "expires": time.time() + ttl if ttl is not None else None,
+            "meta": meta,
+        }
+        self._write_atomic(meta_path, json.dumps(record).encode("utf-8"))
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        # Write to a temporary name first so readers never see a partial file
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the namespace fits in `max_bytes`."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.bin"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total: int = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                path.with_suffix(".json").unlink(missing_ok=True)
+                total -= size
+
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
@@ -0,0 +1,182 @@
+"""
+Condensation of fetched articles before they are sent to the script writer.
+
+Each article is cut down to a per-story token budget by keeping its most salient
+sentences (frequent content words, overlap with the headline and position in the story),
+in their original order; a sentence longer than the whole budget (e.g. in text without
+sentence punctuation) is truncated instead. Near-identical wire stories carried by
+several publishers are merged into one. Tokens are counted with tiktoken when it is
+installed, and estimated from the text length otherwise.
+"""
+
+# Python standard libraries
+import math
+import re
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Local imports
+import metrics
+from fingerprint import NEAR_DUPLICATE_DISTANCE, hamming_distance, simhash
+
+try:
+    import tiktoken
+    HAVE_TIKTOKEN: bool = True
+except ImportError:  # Optional; fall back to an estimate
+    HAVE_TIKTOKEN = False
+
+TOKENIZER_MODEL: str = "gpt-4o-mini"
+TOKENS_PER_STORY: int = 600
+CHARS_PER_TOKEN: float = 4.0  # Rough average for English text when tiktoken is missing
+MIN_FINGERPRINT_WORDS: int = 40  # Shorter articles (e.g. failed scrapes) are never merged
+
+# A sentence ends at . ! or ? (and any closing quotes) before a space, except after an
+# initial such as the second one in "U.S.", or right after a CJK full stop
+SENTENCE_PATTERN = re.compile(r"(?<!\b[A-Z]\.)(?<=[.!?])[\"')\]\u201d\u2019]*\s+"
+                              r"|(?<=[\u3002\uff01\uff1f])\s*")
+WORD_PATTERN = re.compile(r"[\w']+")
+STOPWORDS: frozenset = frozenset(
+    "a an and are as at be been but by for from had has have he her his i in is it its of on "
+    "or our she said says that the their them they this to was we were which who will with "
+    "would you".split()
+)
+
+_encoding: Any = None
+
+
+def get_encoding() -> Any:
+    """Return the script writer's tiktoken encoding (tiktoken must be installed)."""
+    global _encoding  # pylint: disable=global-statement
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens `text` uses in the script writer's prompt."""
+    if not HAVE_TIKTOKEN:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """Return the longest run of whole words at the start of `text` that fits in `budget`."""
+    if not HAVE_TIKTOKEN:
+        cut = text[:max(0, int(budget * CHARS_PER_TOKEN))]
+    else:
+        cut = get_encoding().decode(get_encoding().encode(text, disallowed_special=())[:budget])
+    if len(cut) < len(text) and not text[len(cut)].isspace() and " " in cut:
+        cut = cut[:cut.rfind(" ")]  # Don't end in the middle of a word
+    return cut.strip()
+
+def split_sentences(paragraph: str) -> List[str]:
+    """Split a paragraph into sentences."""
+    return [sentence.strip() for sentence in SENTENCE_PATTERN.split(paragraph) if sentence.strip()]
+
+def content_words(text: str) -> List[str]:
+    """Return the lowercased words of `text` that are not stopwords."""
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+def condense_text(text: str, budget: int = TOKENS_PER_STORY, headline: str = "") -> str:
+    """
+    Return `text` cut down to at most `budget` tokens by keeping its most salient sentences.
+
+    Text that already fits is returned unchanged. Kept sentences stay in their original
+    order and paragraphs. A sentence that is longer than the whole budget (e.g. in text
+    without sentence punctuation) is cut down to its first words instead.
+    """
+    if count_tokens(text) <= budget:
+        return text
+
+    # (paragraph index, sentence) in reading order
+    sentences = [(index, sentence if count_tokens(sentence) < budget
+                  else truncate_tokens(sentence, budget - 1))
+                 for index, paragraph in enumerate(p for p in text.split("\n") if p.strip())
+                 for sentence in split_sentences(paragraph)]
+    frequencies = Counter(word for _, sentence in sentences for word in content_words(sentence))
+    top_frequency = max(frequencies.values(), default=1)
+    headline_words = set(content_words(headline))
+
+    def salience(position: int, sentence: str) -> float:
+        words = content_words(sentence)
+        if not words:
+            return 0.0
+        frequency = sum(frequencies[word] for word in words) / (len(words) * top_frequency)
+        overlap = len(headline_words.intersection(words)) / (len(headline_words) or 1)
+        lead = 1.0 / (1 + position / 3)  # News puts the key facts first
+        return frequency + overlap + lead
+
+    ranked = sorted(range(len(sentences)), key=lambda i: salience(i, sentences[i][1]),
+                    reverse=True)
+    chosen: List[int] = []
+    used = 0
+    for i in ranked:
+        cost = count_tokens(sentences[i][1]) + 1
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+
+    if not chosen:
+        return truncate_tokens(text, budget)
+
+    paragraphs: Dict[int, List[str]] = {}
+    for i in sorted(chosen):
+        paragraphs.setdefault(sentences[i][0], []).append(sentences[i][1])
+    return "\n".join(" ".join(paragraph) for paragraph in paragraphs.values())
+
+def deduplicate(news: List[Dict[str, str]],
+                max_distance: int = NEAR_DUPLICATE_DISTANCE) -> List[Dict[str, str]]:
+    """
+    Drop articles that are near-duplicates of an earlier one.
+
+    The publisher of a dropped copy is credited on the article that is kept.
+    """
+    kept: List[Dict[str, str]] = []
+    fingerprints: List[Optional[int]] = []
+    for article in news:
+        fingerprint = None
+        if len(article["content"].split()) >= MIN_FINGERPRINT_WORDS:
+            fingerprint = simhash(article["content"])
+        duplicate_of = next((index for index, other in enumerate(fingerprints)
+                             if fingerprint is not None and other is not None
+                             and hamming_distance(fingerprint, other) <= max_distance), None)
+        if duplicate_of is None:
+            kept.append(dict(article))
+            fingerprints.append(fingerprint)
+            continue
+        original = kept[duplicate_of]
+        kept[duplicate_of] = {**original,
+                              "publisher": f"{original['publisher']}, {article['publisher']}"}
+        metrics.count("condense.duplicates")
+    return kept
+
+def condense_news(news: List[Dict[str, str]],
+                  tokens_per_story: int = TOKENS_PER_STORY,
+                  max_distance: Optional[int] = NEAR_DUPLICATE_DISTANCE) -> List[Dict[str, str]]:
+    """
+    Deduplicate the fetched articles and fit each one into `tokens_per_story` tokens.
+
+    Args:
+        news: Articles as returned by `fetch_news`
+        tokens_per_story: Token budget for each article's content
+        max_distance: SimHash distance below which two articles are the same story
+            (None keeps every article)
+
+    Returns:
+        List[Dict[str, str]]: Condensed copies of the articles, in their original order
+    """
+    if max_distance is not None:
+        news = deduplicate(news, max_distance)
+    condensed: List[Dict[str, str]] = []
+    for article in news:
+        content = condense_text(article["content"], tokens_per_story, article["headline"])
+        metrics.count("condense.tokens_in", count_tokens(article["content"]))
+        metrics.count("condense.tokens_out", count_tokens(content))
+        condensed.append({**article, "content": content})
+    return condensed
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
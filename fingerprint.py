@@ -0,0 +1,51 @@
+"""
+Text fingerprints for spotting near-identical articles.
+
+Wire stories are often republished by several outlets with small edits (a different
+headline, an added byline or paragraph). A 64-bit SimHash over word shingles maps such
+copies to fingerprints that differ in only a few bits, so duplicates can be found by
+comparing Hamming distances instead of full texts.
+"""
+
+# Python standard libraries
+import hashlib
+import re
+import sys
+from typing import Iterable, List
+
+FINGERPRINT_BITS: int = 64
+SHINGLE_SIZE: int = 3  # Words per shingle
+NEAR_DUPLICATE_DISTANCE: int = 8  # Max differing bits for two texts to count as the same story
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Return the overlapping `size`-word sequences of `text`, lowercased."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+def simhash(text: str, bits: int = FINGERPRINT_BITS) -> int:
+    """Return the SimHash fingerprint of `text`."""
+    weights = [0] * bits
+    for shingle in shingles(text):
+        digest = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"),
+                                                digest_size=bits // 8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += 1 if digest >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming_distance(a: int, b: int) -> int:
+    """Return the number of bits in which two fingerprints differ."""
+    return bin(a ^ b).count("1")
+
+def is_near_duplicate(fingerprint: int, others: Iterable[int],
+                      max_distance: int = NEAR_DUPLICATE_DISTANCE) -> bool:
+    """Return True if `fingerprint` is within `max_distance` bits of any of `others`."""
+    return any(hamming_distance(fingerprint, other) <= max_distance for other in others)
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
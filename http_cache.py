@@ -0,0 +1,129 @@
+"""
+HTTP response caching for NewsAPI requests and scraped article pages.
+
+Responses are stored in a `DiskCache` keyed by URL and query parameters (minus secrets
+such as the API key). Expired entries are revalidated with ETag/Last-Modified headers so
+an unchanged page costs a 304 instead of a full download.
+"""
+
+# Python standard libraries
+import json
+import sys
+from typing import Any, Dict, Iterable, Optional
+
+# 3rd party imports
+import requests
+
+# Local imports
+from cache import DiskCache
+import metrics
+
+NEWS_API_TTL: float = 15 * 60  # Headlines change often, but not minute to minute
+ARTICLE_TTL: float = 6 * 60 * 60  # Published articles rarely change
+
+_http_cache: Optional[DiskCache] = None
+
+
+def get_http_cache() -> DiskCache:
+    """Return the shared cache used for HTTP responses."""
+    global _http_cache  # pylint: disable=global-statement
+    if _http_cache is None:
+        _http_cache = DiskCache("http", max_bytes=128 * 1024 * 1024)
+    return _http_cache
+
+
+class CachedResponse:
+    """Minimal stand-in for `requests.Response` that can be rebuilt from the cache."""
+
+    def __init__(self, status_code: int, content: bytes, encoding: Optional[str],
+                 headers: Dict[str, str], from_cache: bool = False) -> None:
+        self.status_code: int = status_code
+        self.content: bytes = content
+        self.encoding: str = encoding or "utf-8"
+        self.headers: Dict[str, str] = headers
+        self.from_cache: bool = from_cache
+
+    @property
+    def text(self) -> str:
+        """The response body decoded as text."""
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self) -> Any:
+        """The response body parsed as JSON."""
+        return json.loads(self.text)
+
+
+def _network_get(http: Any, url: str, **kwargs: Any) -> requests.Response:
+    """Perform a GET request and record its latency and size."""
+    with metrics.span("http.get"):
+        response = http.get(url, **kwargs)
+    metrics.count("http.requests")
+    metrics.count("http.bytes_fetched", len(response.content))
+    return response
+
+def cached_get(url: str,
+               params: Optional[Dict[str, Any]] = None,
+               session: Optional[requests.Session] = None,
+               ttl: float = ARTICLE_TTL,
+               bypass: bool = False,
+               ignore_params: Iterable[str] = ("apiKey",),
+               timeout: float = 10) -> CachedResponse:
+    """
+    GET `url` through the HTTP cache.
+
+    Fresh entries are returned without touching the network. Stale entries are revalidated
+    with conditional headers. Only 200 responses are stored.
+    Pass `bypass=True` to always hit the network and leave the cache untouched.
+    """
+    http = session or requests
+    cache = get_http_cache()
+
+    if bypass or not cache.enabled:
+        response = _network_get(http, url, params=params, timeout=timeout)
+        return CachedResponse(response.status_code, response.content,
+                              response.encoding or response.apparent_encoding,
+                              dict(response.headers))
+
+    ignored = set(ignore_params)
+    key_params = {k: v for k, v in (params or {}).items() if k not in ignored}
+    key = cache.make_key("GET", url, key_params)
+
+    entry = cache.lookup(key)
+    if entry is not None and entry.fresh:
+        metrics.count("http.cache_hits")
+        return CachedResponse(entry.meta["status"], entry.data, entry.meta.get("encoding"),
+                              entry.meta.get("headers", {}), from_cache=True)
+
+    request_headers: Dict[str, str] = {}
+    if entry is not None:
+        cached_headers = entry.meta.get("headers", {})
+        if "ETag" in cached_headers:
+            request_headers["If-None-Match"] = cached_headers["ETag"]
+        if "Last-Modified" in cached_headers:
+            request_headers["If-Modified-Since"] = cached_headers["Last-Modified"]
+
+    response = _network_get(http, url, params=params, headers=request_headers, timeout=timeout)
+
+    if response.status_code == 304 and entry is not None:
+        metrics.count("http.not_modified")
+        cache.touch(key, ttl)
+        return CachedResponse(entry.meta["status"], entry.data, entry.meta.get("encoding"),
+                              entry.meta.get("headers", {}), from_cache=True)
+
+    encoding = response.encoding or response.apparent_encoding
+    no_store = "no-store" in response.headers.get("Cache-Control", "")
+    if response.status_code == 200 and not no_store:
+        kept_headers = {name: response.headers[name]
+                        for name in ("ETag", "Last-Modified", "Content-Type")
+                        if name in response.headers}
+        cache.set(key, response.content,
+                  meta={"status": 200, "encoding": encoding, "headers": kept_headers},
+                  ttl=ttl)
+
+    return CachedResponse(response.status_code, response.content, encoding,
+                          dict(response.headers))
+
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
@@ -0,0 +1,136 @@
+"""
+Opt-in cache of chat completion responses.
+
+Enabled with the PODCAST_LLM_CACHE environment variable:
+
+- unset/`off`: every call goes to the API (the default)
+- `on`: responses are cached under `.cache/llm/`, keyed by a hash of the model, messages,
+  temperature and seed, and reused until they expire (PODCAST_LLM_CACHE_TTL seconds,
+  one day by default)
+- `replay`: responses come only from the cache; a miss raises LLMCacheMiss instead of
+  calling the API, so later stages can be iterated on and benchmarked deterministically
+
+While the cache is in use the script prompt is made stable (see `ai_script_writer`), so
+re-running the same articles hits the cache.
+"""
+
+# Python standard libraries
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+# Local imports
+import metrics
+from cache import DiskCache
+
+LLM_CACHE_ENV: str = "PODCAST_LLM_CACHE"
+LLM_CACHE_TTL_ENV: str = "PODCAST_LLM_CACHE_TTL"
+DEFAULT_TTL: float = 24 * 60 * 60
+MODES: tuple = ("off", "on", "replay")
+
+_llm_cache: Optional[DiskCache] = None
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a response is not in the cache."""
+
+
+def llm_cache_mode() -> str:
+    """Return the configured mode: 'off', 'on' or 'replay'."""
+    mode = os.getenv(LLM_CACHE_ENV, "off").strip().lower()
+    if mode in ("", "0", "false", "no"):
+        return "off"
+    if mode in ("1", "true", "yes"):
+        return "on"
+    if mode not in MODES:
+        raise ValueError(f"{LLM_CACHE_ENV} must be one of {', '.join(MODES)}, not '{mode}'")
+    return mode
+
+def llm_cache_ttl() -> float:
+    """Return how many seconds cached responses are reused for."""
+    value = os.getenv(LLM_CACHE_TTL_ENV, str(DEFAULT_TTL)).strip()
+    try:
+        ttl = float(value)
+    except ValueError:
+        ttl = -1.0
+    if ttl < 0:
+        raise ValueError(f"{LLM_CACHE_TTL_ENV} must be a number of seconds, not '{value}'")
+    return ttl
+
+def llm_cache_enabled() -> bool:
+    """Return True if responses are read from the cache."""
+    return llm_cache_mode() != "off"
+
+def get_llm_cache() -> DiskCache:
+    """Return the shared cache of chat completion responses."""
+    global _llm_cache  # pylint: disable=global-statement
+    if _llm_cache is None:
+        # Replay must keep working when other caches are bypassed
+        _llm_cache = DiskCache("llm", max_bytes=64 * 1024 * 1024,
+                               default_ttl=llm_cache_ttl(),
+                               enabled=True if llm_cache_mode() == "replay" else None)
+    return _llm_cache
+
+def completion_key(model: str, messages: List[Dict[str, str]], temperature: float,
+                   seed: Optional[int] = None) -> str:
+    """Return the cache key of a chat completion request."""
+    return DiskCache.make_key(model, messages, temperature, seed)
+
+def lookup(key: str) -> Optional[str]:
+    """Return the cached response text for `key`, honoring the configured mode."""
+    mode = llm_cache_mode()
+    if mode == "off":
+        return None
+    cached = get_llm_cache().get(key)
+    if cached is not None:
+        metrics.count("llm.cache_hits")
+        return json.loads(cached)["content"]
+    if mode == "replay":
+        raise LLMCacheMiss(f"No cached response for request {key[:12]} (replay mode)")
+    metrics.count("llm.cache_misses")
+    return None
+
+def store(key: str, content: str, model: str) -> None:
+    """Cache a response text if the cache is on."""
+    if llm_cache_mode() == "on":
+        get_llm_cache().set(key, json.dumps({"content": content}).encode("utf-8"),
+                            {"model": model})
+
+def chat_completion(messages: List[Dict[str, str]],
+                    model: str = "gpt-4o-mini",
+                    temperature: float = 0.7,
+                    seed: Optional[int] = None,
+                    span: str = "openai.chat") -> str:
+    """
+    Return the text of a chat completion, from the cache when it is enabled.
+
+    Args:
+        messages: The chat messages
+        model: Model name
+        temperature: Sampling temperature
+        seed: Sampling seed passed to the API (part of the cache key)
+        span: Name the API call is recorded under in the run report
+    """
+    key = completion_key(model, messages, temperature, seed)
+    content = lookup(key)
+    if content is not None:
+        return content
+
+    # Imported here so checking the cache mode doesn't load the OpenAI SDK
+    from openai_client import get_client, record_usage, with_retry  # pylint: disable=import-outside-toplevel
+
+    client = get_client()
+    extra: Dict[str, Any] = {"seed": seed} if seed is not None else {}
+    with metrics.span(span):
+        response = with_retry(lambda: client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, **extra
+        ))
+    record_usage(response.usage)
+    content = response.choices[0].message.content
+    store(key, content, model)
+    return content
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
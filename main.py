@@ -2,54 +2,81 @@
 News Podcast Maker - A tool to automatically generate news podcasts.
 This module serves as the main entry point, orchestrating the process
 of fetching news, generating scripts, and creating audio content.
+
+Only lightweight modules are imported here; the stages import openai, pydub and
+BeautifulSoup when they run, so `status`, `inspect` and `dry-run` start in milliseconds.
+
+Usage:
+    python main.py [run] [--country us] [--max-articles 5] [--voice nova] [--new-only]
+                         [--renditions mp3-64,opus,hls]
+    python main.py resume RUN_ID
+    python main.py dry-run [--resume RUN_ID]
+    python main.py status
+    python main.py inspect RUN_ID
 """
 # Python standard libraries
-import time
+import argparse
 import os
-from typing import List, Dict, Any
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
 
 # Import local modules
-from terminal import spinner
-from news_fetcher import fetch_news
-from ai_script_writer import write_script
-from tts import gen_speech
-from audio_merge import generate_mixed_audio
+import metrics
+from terminal import Item, spinner
 from cleanup import cleanup_directory
+from scratch import ScratchDir
+from cache import cache_bypassed
+from llm_cache import llm_cache_mode
+from pipeline import STAGES, PipelineRun, list_runs, run_staged, run_streaming
 
-# Main function
-def main() -> None:
-    """
-    Main function to run the news podcast maker.
+def make_episode(pipelined: bool = True,
+                 new_only: bool = False,
+                 resume: Optional[str] = None,
+                 country: str = "us",
+                 max_articles: int = 5,
+                 voice: Optional[str] = None,
+                 renditions: Optional[List[str]] = None) -> None:
     """
-    start: float = time.time()
+    Produce an episode: run the news podcast maker's pipeline and report on it.
 
-    # Fetch news
-    with spinner("Fetching news...", "News fetched!"):
-        news: List[Dict[str, Any]] = fetch_news()
+    Args:
+        pipelined: Stream the script from the model, synthesize each paragraph as it arrives
+            and mix and encode each speech segment as soon as it is synthesized, instead of
+            running every stage to completion before starting the next
+        new_only: Only cover stories that are new or have changed since an earlier run
+        resume: Id of an earlier run to continue; stages whose inputs are unchanged are
+            skipped and their saved outputs reused
+        country: 2-letter ISO 3166-1 code of the country to cover
+        max_articles: Maximum number of articles to cover
+        voice: Host voice (picked at random if not given)
+        renditions: Extra delivery formats to encode alongside the MP3 (see
+            `audio_merge.RENDITIONS`); defaults to those listed in PODCAST_RENDITIONS
 
-    # Write script
-    with spinner("Writing script...", "Script written!"):
-        script: str
-        voice: str
-        script, voice, headline = write_script(news)
-
-    # # Translate script to another language (optional)
-    # with spinner("Translating script...", "Script translated!"):
-    #     target_language: str = "Spanish"  # Example - use full language name
-    #     script: str = translate_text(script, target_language)
-
-    # Generate speech
-    with spinner("Synthesizing speech...", "Speech synthesized!"):
-        speech_file_path: str = gen_speech(script, voice)
+    Each stage's output is saved under `runs/<run-id>/` (see pipeline.py), so a failed run
+    can be resumed. Temporary files go to a scratch directory owned by this run, so several
+    runs can execute side by side. A JSON report with per-stage timings and resource usage
+    is written to `reports/<run-id>.json` (a resumed run's to `reports/<run-id>.2.json`, and
+    so on).
+    Set PODCAST_TRACE=1 to also write a Chrome trace of the run.
+    """
+    start: float = time.time()
+    if resume:
+        run = PipelineRun.load(resume)
+    else:
+        run = PipelineRun.create(country, max_articles, new_only, voice,
+                                 renditions=renditions)
+    print(f"Run id: {run.run_id}")
 
-    # Generate final podcast audio
-    with spinner("Generating final audio...", "Final audio generated!"):
-        # The clip is also saved in the 'clips' directory as backup
-        final_audio_path: str = generate_mixed_audio(speech_file_path, title=headline.capitalize())
+    # The report is named after the run, so reports/<run-id>.json goes with runs/<run-id>/
+    with metrics.recorded_run(run.run_id):
+        final_audio_path = execute_run(run, pipelined and not resume)
 
-    # Cleanup temporary files
-    with spinner("Cleaning up temporary files...", "Temporary files cleaned!"):
-        cleanup_directory() # Cleanup all temporary files by default
+    if final_audio_path is None:
+        print("No new stories since the last run.")
+        return
 
     # Clone the final audio file to the user's downloads folder (assuming macOS)
     # os.system(f"cp {final_audio_path} ~/Downloads")
@@ -62,6 +89,166 @@ def main() -> None:
     # Open the final audio file
     # os.system(f"open {final_audio_path}")
 
+def execute_run(run: PipelineRun, pipelined: bool) -> Optional[str]:
+    """Execute the run's stages and return the episode path (see `make_episode`)."""
+    scratch = ScratchDir().open()
+    try:
+        if pipelined:
+            # Write, synthesize, mix and encode in one pass; each stage starts on the first
+            # paragraph while later ones are still being written
+            return run_streaming(run)
+        return run_staged(run)
+    except Exception:
+        print(f"Run failed. Resume it with: python main.py resume {run.run_id}")
+        raise
+    finally:
+        # Cleanup temporary files: this run's own scratch, plus any left behind by dead runs
+        with spinner("Cleaning up temporary files...", "Temporary files cleaned!"):
+            scratch.close()
+            cleanup_directory()
+
+def dry_run(new_only: bool = False,
+            resume: Optional[str] = None,
+            country: str = "us",
+            max_articles: int = 5,
+            voice: Optional[str] = None,
+            renditions: Optional[List[str]] = None) -> bool:
+    """
+    Print what a run would do, without calling any API or writing anything.
+
+    Returns:
+        bool: False if a prerequisite is missing
+    """
+    ready: bool = True
+    for name in ("OPENAI_API_KEY", "NEWS_API_KEY"):
+        if os.getenv(name):
+            Item.checked(f"{name} is set")
+        else:
+            Item.failed(f"{name} is not set")
+            ready = False
+    for program in ("ffmpeg", "ffprobe"):
+        if shutil.which(program):
+            Item.checked(f"{program} found")
+        else:
+            Item.failed(f"{program} not found on PATH")
+            ready = False
+    Item.info(f"Caches: {'bypassed' if cache_bypassed() else 'on'}, "
+              f"LLM cache: {llm_cache_mode()}")
+
+    if resume is None:
+        if renditions is None:
+            renditions = [name for name in os.getenv("PODCAST_RENDITIONS", "").split(",") if name]
+        print(f"Would start a new run: country={country}, max_articles={max_articles}, "
+              f"new_only={new_only}, voice={voice or 'random'}, "
+              f"renditions={','.join(renditions) or 'none'}")
+        for stage in STAGES.values():
+            print(f"  {stage.name:<9} run")
+        return ready
+
+    run = PipelineRun.load(resume)
+    print(f"Would resume run {run.run_id}: " +
+          ", ".join(f"{key}={value}" for key, value in run.params.items()))
+    # A stage that reruns may change its output, which makes the stages after it run again
+    rerun: set = set()
+    for stage in STAGES.values():
+        if run.stage_status(stage.name) != "done":
+            action = "run"
+        elif rerun.intersection(stage.inputs):
+            action = "reuse, unless its inputs change"
+        else:
+            print(f"  {stage.name:<9} reuse")
+            continue
+        rerun.add(stage.name)
+        print(f"  {stage.name:<9} {action}")
+    return ready
+
+def show_status(limit: int = 10) -> None:
+    """Print a summary of the most recent runs."""
+    run_ids = list_runs()[-limit:]
+    if not run_ids:
+        print("No runs yet.")
+        return
+    for run_id in run_ids:
+        run = PipelineRun.load(run_id)
+        completed = [name for name in STAGES if name in run.manifest["stages"]]
+        if "export" in completed:
+            outcome = f"'{run.read_json('export')['path']}'"
+        else:
+            outcome = f"incomplete, next stage: {next(n for n in STAGES if n not in completed)}"
+        print(f"{run_id}  {run.params['country']}  {len(completed)}/{len(STAGES)}  {outcome}")
+
+def inspect_run(run_id: str) -> None:
+    """Print a run's parameters and the state of each of its stages."""
+    run = PipelineRun.load(run_id)
+    print(f"Run {run.run_id} (created {datetime.fromtimestamp(run.manifest['created']):%c})")
+    for key, value in run.params.items():
+        print(f"  {key}: {value}")
+    for stage in STAGES.values():
+        record = run.manifest["stages"].get(stage.name)
+        status = run.stage_status(stage.name)
+        detail = ""
+        if record is not None:
+            seconds = f", {record['seconds']:.2f} s" if record.get("seconds") else ""
+            detail = f" ({datetime.fromtimestamp(record['completed']):%X}{seconds})"
+        print(f"  {stage.name:<9} {status:<8} {run.path(stage.name).name}{detail}")
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command line parser."""
+    run_options = argparse.ArgumentParser(add_help=False)
+    run_options.add_argument("--country", default="us",
+                             help="2-letter code of the country to cover")
+    run_options.add_argument("--max-articles", type=int, default=5)
+    run_options.add_argument("--voice", help="Host voice (random if not given)")
+    run_options.add_argument("--sequential", action="store_true",
+                             help="Run each stage to completion before starting the next")
+    run_options.add_argument("--new-only", action="store_true",
+                             help="Only cover stories that are new since an earlier run")
+    run_options.add_argument("--renditions",
+                             type=lambda value: [name for name in value.split(",") if name],
+                             help="Comma-separated extra formats: mp3-192, mp3-128, mp3-64, "
+                                  "opus, hls (default: PODCAST_RENDITIONS)")
+
+    parser = argparse.ArgumentParser(description="Generate a news podcast episode.",
+                                     parents=[run_options])
+    parser.add_argument("--resume", metavar="RUN_ID", help="Same as `resume RUN_ID`")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", parents=[run_options], help="Produce an episode (the default)")
+    resume_parser = commands.add_parser(
+        "resume", help="Continue an earlier run, skipping stages whose inputs are unchanged")
+    resume_parser.add_argument("run_id")
+    dry_run_parser = commands.add_parser(
+        "dry-run", parents=[run_options],
+        help="Check the setup and show which stages a run would execute")
+    dry_run_parser.add_argument("--resume", metavar="RUN_ID")
+    status_parser = commands.add_parser("status", help="List recent runs")
+    status_parser.add_argument("--limit", type=int, default=10)
+    inspect_parser = commands.add_parser("inspect", help="Show the stages of a run")
+    inspect_parser.add_argument("run_id")
+    return parser
+
+def main() -> None:
+    """Parse the command line and run the requested command."""
+    parser = build_parser()
+    args = parser.parse_args()
+    run_id: Optional[str] = getattr(args, "run_id", None) or args.resume
+    if run_id is not None and run_id not in list_runs():
+        parser.error(f"no run '{run_id}'; list the recorded runs with `python main.py status`")
+
+    if args.command == "status":
+        show_status(args.limit)
+    elif args.command == "inspect":
+        inspect_run(args.run_id)
+    elif args.command == "dry-run":
+        if not dry_run(args.new_only, args.resume, args.country, args.max_articles, args.voice,
+                       args.renditions):
+            sys.exit(1)
+    elif args.command == "resume":
+        make_episode(resume=args.run_id)
+    else:
+        make_episode(pipelined=not args.sequential, new_only=args.new_only, resume=args.resume,
+                     country=args.country, max_articles=args.max_articles, voice=args.voice,
+                     renditions=args.renditions)
+
 # Entry point
 if __name__ == "__main__":
     main()
@@ -0,0 +1,211 @@
+"""
+Per-run instrumentation for the podcast pipeline.
+
+Records wall time, CPU time, peak memory and counter deltas for each stage, plus latencies
+for individual API calls and other spans. Stages are recorded by `terminal.spinner`;
+nested call sites use `span()` and `count()`. At the end of a run the report is written as
+JSON to `reports/<run-id>.json`, the id of the run's directory under `runs/`, optionally
+alongside a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+# Python standard libraries
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional
+
+try:
+    import resource
+    HAVE_RESOURCE: bool = True
+except ImportError:  # Not available on Windows
+    HAVE_RESOURCE = False
+
+REPORTS_DIR: Path = Path(__file__).parent / "reports"
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """Return the peak resident set size of this process (or its finished children)."""
+    if not HAVE_RESOURCE:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux reports kilobytes, macOS reports bytes
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+class RunReport:
+    """Collects stage timings, counters and call latencies for a single run."""
+
+    def __init__(self, run_id: Optional[str] = None) -> None:
+        self.run_id: str = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.started: float = time.time()
+        self.stages: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+        self.calls: Dict[str, List[float]] = {}
+        self.trace_events: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None  # Set when the run fails
+        self._origin: float = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Add `value` to the counter `name`."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def _trace(self, name: str, category: str, start: float, duration: float,
+               args: Optional[Dict[str, Any]] = None) -> None:
+        event = {
+            "name": name, "cat": category, "ph": "X",
+            "ts": (start - self._origin) * 1e6, "dur": duration * 1e6,
+            "pid": os.getpid(), "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.trace_events.append(event)
+
+    @contextmanager
+    def span(self, name: str, category: str = "call") -> Generator[None, None, None]:
+        """Time a nested operation such as an API call and record its latency."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.calls.setdefault(name, []).append(duration)
+            self._trace(name, category, start, duration)
+
+    @contextmanager
+    def stage(self, name: str) -> Generator[None, None, None]:
+        """Record wall time, CPU time, peak memory and counter changes for a pipeline stage."""
+        with self._lock:
+            counters_before = dict(self.counters)
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        error: Optional[str] = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            with self._lock:
+                counter_deltas = {
+                    key: value - counters_before.get(key, 0)
+                    for key, value in self.counters.items()
+                    if value != counters_before.get(key, 0)
+                }
+            record = {
+                "name": name,
+                "wall_seconds": round(wall, 4),
+                "cpu_seconds": round(time.process_time() - cpu_start, 4),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "counters": counter_deltas,
+            }
+            if error:
+                record["error"] = error
+            with self._lock:
+                self.stages.append(record)
+            self._trace(name, "stage", start, wall, {"counters": counter_deltas})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the report as a JSON-serializable dictionary."""
+        with self._lock:
+            calls = {
+                name: {
+                    "count": len(latencies),
+                    "total_seconds": round(sum(latencies), 4),
+                    "mean_seconds": round(sum(latencies) / len(latencies), 4),
+                    "max_seconds": round(max(latencies), 4),
+                }
+                for name, latencies in self.calls.items()
+            }
+            return {
+                "run_id": self.run_id,
+                "started": self.started,
+                "wall_seconds": round(time.time() - self.started, 4),
+                "cpu_seconds": round(time.process_time(), 4),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "children_peak_rss_bytes": peak_rss_bytes(children=True),
+                "stages": list(self.stages),
+                "counters": dict(self.counters),
+                "calls": calls,
+                "error": self.error,
+            }
+
+    def write(self, directory: Optional[Path] = None, chrome_trace: bool = False) -> Path:
+        """
+        Write the report (and optionally a Chrome trace) and return the report's path.
+
+        The report is named after the run id. Reports of earlier attempts at the same run
+        (e.g. before it was resumed) are kept; later ones are numbered `<run-id>.2.json`, ...
+        """
+        directory = directory or REPORTS_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        name, attempt = self.run_id, 1
+        while (directory / f"{name}.json").exists():
+            attempt += 1
+            name = f"{self.run_id}.{attempt}"
+        report_path = directory / f"{name}.json"
+        report_path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        if chrome_trace:
+            with self._lock:
+                events = list(self.trace_events)
+            trace_path = directory / f"{name}.trace.json"
+            trace_path.write_text(json.dumps({"traceEvents": events}), encoding="utf-8")
+        return report_path
+
+
+_report: RunReport = RunReport()
+
+
+def get_report() -> RunReport:
+    """Return the report for the current run."""
+    return _report
+
+def new_report(run_id: Optional[str] = None) -> RunReport:
+    """Start a fresh report, e.g. at the beginning of a run, and return it."""
+    global _report  # pylint: disable=global-statement
+    _report = RunReport(run_id)
+    return _report
+
+@contextmanager
+def recorded_run(run_id: Optional[str] = None) -> Generator[RunReport, None, None]:
+    """
+    Start a fresh report for a run and write it when the run ends, whether or not it fails.
+
+    Set PODCAST_TRACE=1 to also write a Chrome trace.
+    """
+    report = new_report(run_id)
+    try:
+        yield report
+    except BaseException as e:
+        report.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        # Failed runs get a report too; it shows how far they got and where time went
+        report_path = report.write(chrome_trace=os.getenv("PODCAST_TRACE", "") not in ("", "0"))
+        print(f"Run report: '{report_path}'")
+
+def count(name: str, value: float = 1) -> None:
+    """Add `value` to the counter `name` in the current report."""
+    _report.count(name, value)
+
+def span(name: str, category: str = "call"):
+    """Time a nested operation in the current report."""
+    return _report.span(name, category)
+
+def stage(name: str):
+    """Record a pipeline stage in the current report."""
+    return _report.stage(name)
+
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
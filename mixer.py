@@ -0,0 +1,415 @@
+"""
+NumPy mixing engine for the final podcast audio.
+
+Reproduces the pydub mixing steps of `audio_merge` (looped background music with
+cross-fades, the tail fade, the overlay under the speech and the intro/outro concatenation)
+on int16 sample arrays. Every step writes into a preallocated buffer in fixed-size blocks
+instead of building ever-growing AudioSegments, so memory stays proportional to the
+episode and time is linear in its length. `StreamingMixer` produces the same audio block
+by block from incoming speech, so memory stays constant regardless of episode length.
+
+Gain ramps, rounding and clipping follow pydub/audioop exactly, so the output is
+sample-for-sample identical to the previous implementation.
+"""
+
+# Python standard libraries
+import audioop  # pylint: disable=deprecated-module
+import sys
+from typing import Iterable, Iterator, Optional
+
+# 3rd party imports
+import numpy as np
+from pydub import AudioSegment
+from pydub.utils import db_to_float
+
+# Local imports
+from asset_store import AudioAsset
+
+BLOCK_FRAMES: int = 1 << 18  # Frames processed per step (~6 s at 44.1 kHz)
+BGM_TRIM_MS: int = 3000  # Trimmed from the end of the music before each loop
+BGM_CROSSFADE_MS: int = 1500  # Fade at both ends of each loop
+BGM_TAIL_FADE_MS: int = 10000  # Fade-out at the end of the music bed
+
+
+def ms_to_frames(ms: float, frame_rate: int) -> int:
+    """Convert milliseconds to a frame index the way pydub does when slicing."""
+    return int(ms * (frame_rate / 1000.0))
+
+def frames_to_ms(frame_count: int, frame_rate: int) -> int:
+    """Return the length in milliseconds pydub reports for `frame_count` frames."""
+    return round(1000 * (float(frame_count) / frame_rate))
+
+def sliced_length(frame_count: int, frame_rate: int) -> int:
+    """
+    Frames left after pydub's `segment[0:]`, which rounds to whole milliseconds.
+
+    pydub pads with silence when the rounded length is longer than the data.
+    """
+    return ms_to_frames(frames_to_ms(frame_count, frame_rate), frame_rate)
+
+def scale(samples: np.ndarray, gains: np.ndarray) -> np.ndarray:
+    """Multiply int16 frames by per-frame gains with audioop.mul's rounding and clipping."""
+    values = samples.astype(np.float64) * gains[:, np.newaxis]
+    # audioop floors the product and maps anything below -32767 to -32768
+    values = np.where(values > 32767, 32767, np.where(values < -32767.0, -32768, np.floor(values)))
+    return values.astype(np.int16)
+
+def add_clipped(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Add two int16 arrays, saturating like audioop.add."""
+    return np.clip(first.astype(np.int32) + second, -32768, 32767).astype(np.int16)
+
+
+class Fade:
+    """
+    A pydub `fade()` resolved against a segment of known length.
+
+    pydub applies one gain step per millisecond for fades longer than 100 ms and one per
+    frame for shorter ones. Its output is always `ms_to_frames(len(segment))` frames long,
+    padded with silence or trimmed as needed. `gains()` evaluates that curve for any range of
+    output frames, so a fade can be applied block by block.
+    """
+
+    def __init__(self, frame_count: int, frame_rate: int, to_gain: float = 0.0,
+                 from_gain: float = 0.0, start: Optional[float] = None,
+                 end: Optional[float] = None, duration: Optional[int] = None) -> None:
+        length_ms = frames_to_ms(frame_count, frame_rate)
+
+        # Resolve start/end/duration exactly like AudioSegment.fade
+        start = min(length_ms, start) if start is not None else None
+        end = min(length_ms, end) if end is not None else None
+        if start is not None and start < 0:
+            start += length_ms
+        if end is not None and end < 0:
+            end += length_ms
+        if duration:
+            if start is not None:
+                end = start + duration
+            elif end is not None:
+                start = end - duration
+        else:
+            duration = end - start
+
+        self.frame_rate: int = frame_rate
+        self.length: int = ms_to_frames(length_ms, frame_rate)
+        self.from_power: float = db_to_float(from_gain)
+        self.to_power: float = db_to_float(to_gain)
+        self.scale_before: bool = from_gain != 0
+        self.scale_after: bool = to_gain != 0
+        self.fade_start: int = ms_to_frames(start, frame_rate)
+        self.fade_end: int = ms_to_frames(end, frame_rate)
+        gain_delta: float = self.to_power - self.from_power
+
+        self.boundaries: Optional[np.ndarray] = None
+        if duration > 100:
+            # One step per millisecond; boundaries[i] is the first frame of step i
+            self.scale_step: float = gain_delta / duration
+            self.boundaries = (np.arange(start, end + 1) * (frame_rate / 1000.0)).astype(np.int64)
+        else:
+            # One step per frame
+            fade_frames = end * (frame_rate / 1000.0) - start * (frame_rate / 1000.0)
+            self.scale_step = gain_delta / fade_frames if fade_frames else 0.0
+            self.fade_end = self.fade_start + int(fade_frames)
+
+    def gains(self, first: int, last: int) -> np.ndarray:
+        """Return the gain applied to output frames `first` up to (not including) `last`."""
+        gains = np.empty(last - first, dtype=np.float64)
+        fade_start = min(max(self.fade_start - first, 0), last - first)
+        fade_end = min(max(self.fade_end - first, fade_start), last - first)
+        gains[:fade_start] = self.from_power if self.scale_before else 1.0
+        gains[fade_end:] = self.to_power if self.scale_after else 1.0
+        if fade_start < fade_end:
+            frames = np.arange(first + fade_start, first + fade_end, dtype=np.int64)
+            if self.boundaries is not None:
+                steps = np.searchsorted(self.boundaries, frames, side="right") - 1
+            else:
+                steps = frames - self.fade_start
+            gains[fade_start:fade_end] = self.from_power + self.scale_step * steps
+        return gains
+
+    def is_identity(self, first: int, last: int) -> bool:
+        """True if frames `first`..`last` pass through the fade untouched."""
+        return ((last <= self.fade_start and not self.scale_before)
+                or (first >= self.fade_end and not self.scale_after))
+
+    def apply(self, samples: np.ndarray) -> np.ndarray:
+        """Apply the fade to a whole (frames, channels) array and return a new array."""
+        output = np.zeros((self.length, samples.shape[1]), dtype=np.int16)
+        available = min(len(samples), self.length)
+        for first in range(0, available, BLOCK_FRAMES):
+            last = min(first + BLOCK_FRAMES, available)
+            if self.is_identity(first, last):
+                output[first:last] = samples[first:last]
+            else:
+                output[first:last] = scale(samples[first:last], self.gains(first, last))
+        return output
+
+
+def to_array(segment: AudioSegment, frame_rate: Optional[int] = None,
+             channels: Optional[int] = None) -> np.ndarray:
+    """Convert an AudioSegment to int16 (frames, channels), resampling with pydub if asked."""
+    segment = (segment.set_channels(channels or segment.channels)
+               .set_frame_rate(frame_rate or segment.frame_rate)
+               .set_sample_width(2))
+    return np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, segment.channels)
+
+def conform(asset: AudioAsset, frame_rate: int, channels: int) -> np.ndarray:
+    """Return an asset's samples in the requested format, converting only if needed."""
+    if asset.frame_rate == frame_rate and asset.channels == channels:
+        return asset.samples
+    return to_array(asset.to_segment(), frame_rate, channels)
+
+def build_bgm_tile(bgm: np.ndarray, frame_rate: int) -> np.ndarray:
+    """Trim the music and cross-fade both ends, producing the unit that gets looped."""
+    bgm_ms = frames_to_ms(len(bgm), frame_rate)
+    if bgm_ms <= BGM_TRIM_MS:
+        raise ValueError(f"Background music must be longer than {BGM_TRIM_MS / 1000:.0f} seconds")
+    tile = bgm[:ms_to_frames(bgm_ms - BGM_TRIM_MS, frame_rate)]
+    tile = Fade(len(tile), frame_rate, to_gain=-120, end=float("inf"),
+                duration=BGM_CROSSFADE_MS).apply(tile)
+    return Fade(len(tile), frame_rate, from_gain=-120, start=0,
+                duration=BGM_CROSSFADE_MS).apply(tile)
+
+def loop_count(tile_frames: int, frame_rate: int, speech_ms: int) -> int:
+    """Number of tiles the old `while len(bgm_loop) < len(speech)` loop would append."""
+    count = max(0, int(speech_ms * frame_rate / 1000 / tile_frames) - 1)
+    while frames_to_ms(count * tile_frames, frame_rate) < speech_ms:
+        count += 1
+    return count
+
+def bed_frames(tile: np.ndarray, looped_frames: int, first: int, last: int) -> np.ndarray:
+    """Return frames `first`..`last` of the looped music bed without materializing the loop."""
+    output = np.zeros((last - first, tile.shape[1]), dtype=np.int16)
+    position = first
+    while position < min(last, looped_frames):
+        offset = position % len(tile)
+        count = min(len(tile) - offset, last - position, looped_frames - position)
+        output[position - first:position - first + count] = tile[offset:offset + count]
+        position += count
+    return output
+
+def tail_fade(speech_ms: int, frame_rate: int) -> Optional[Fade]:
+    """The fade-out applied to the music bed once it has been cut to the speech's length."""
+    bed_length = ms_to_frames(speech_ms, frame_rate)
+    bed_ms = frames_to_ms(bed_length, frame_rate)
+    if bed_ms == 0:
+        return None
+    return Fade(bed_length, frame_rate, to_gain=-120, end=float("inf"),
+                duration=min(BGM_TAIL_FADE_MS, bed_ms))
+
+def overlay_bed(speech_samples: np.ndarray, speech_ms: int, bgm_samples: np.ndarray,
+                frame_rate: int, output: np.ndarray) -> np.ndarray:
+    """
+    Write the speech with the looped, faded music bed under it into `output`.
+
+    `speech_samples` and `bgm_samples` must already share `frame_rate` and channel count.
+    `speech_ms` is the speech's length before conversion, which is what the loop measured.
+    `output` must hold `sliced_length(len(speech_samples), frame_rate)` frames.
+    """
+    available = min(len(speech_samples), len(output))
+    output[available:] = 0
+    fade = tail_fade(speech_ms, frame_rate)
+    if fade is None:
+        output[:available] = speech_samples[:available]
+        return output
+
+    tile = build_bgm_tile(bgm_samples, frame_rate)
+    looped_frames = loop_count(len(tile), frame_rate, speech_ms) * len(tile)
+    overlaid = min(len(output), fade.length)
+
+    for first in range(0, len(output), BLOCK_FRAMES):
+        last = min(first + BLOCK_FRAMES, len(output))
+        if first < available:
+            output[first:min(last, available)] = speech_samples[first:min(last, available)]
+        if first < overlaid:
+            stop = min(last, overlaid)
+            bed = bed_frames(tile, looped_frames, first, stop)
+            if not fade.is_identity(first, stop):
+                bed = scale(bed, fade.gains(first, stop))
+            output[first:stop] = add_clipped(output[first:stop], bed)
+    return output
+
+def mix_speech(speech: AudioSegment, bgm: AudioAsset) -> np.ndarray:
+    """
+    Lay the looped, faded music bed under the speech.
+
+    Args:
+        speech: The synthesized speech
+        bgm: Background music with its fade-in and gain already applied
+
+    Returns:
+        np.ndarray: int16 (frames, channels) array in the combined speech/music format
+    """
+    frame_rate = max(speech.frame_rate, bgm.frame_rate)
+    channels = max(speech.channels, bgm.channels)
+    speech_samples = to_array(speech, frame_rate, channels)
+    output = np.empty((sliced_length(len(speech_samples), frame_rate), channels), dtype=np.int16)
+    return overlay_bed(speech_samples, len(speech), conform(bgm, frame_rate, channels),
+                       frame_rate, output)
+
+def mix_episode(speech: AudioSegment, bgm: AudioAsset, intro: AudioAsset,
+                outro: AudioAsset) -> AudioSegment:
+    """Mix the speech with the music bed and wrap it in the intro and outro."""
+    mix_rate = max(speech.frame_rate, bgm.frame_rate)
+    mix_channels = max(speech.channels, bgm.channels)
+    frame_rate = max(intro.frame_rate, mix_rate, outro.frame_rate)
+    channels = max(intro.channels, mix_channels, outro.channels)
+
+    if (mix_rate, mix_channels) == (frame_rate, channels):
+        mixed_samples = None
+        speech_samples = to_array(speech, frame_rate, channels)
+        mixed_frames = sliced_length(len(speech_samples), frame_rate)
+    else:
+        # Rare: the jingles have a different format, so convert the mix like pydub would
+        mixed_segment = AudioSegment(data=mix_speech(speech, bgm).tobytes(), sample_width=2,
+                                     frame_rate=mix_rate, channels=mix_channels)
+        mixed_samples = to_array(mixed_segment, frame_rate, channels)
+        mixed_frames = len(mixed_samples)
+
+    intro_samples = conform(intro, frame_rate, channels)
+    outro_samples = conform(outro, frame_rate, channels)
+    final = np.empty((len(intro_samples) + mixed_frames + len(outro_samples), channels),
+                     dtype=np.int16)
+    mixed_region = final[len(intro_samples):len(intro_samples) + mixed_frames]
+
+    final[:len(intro_samples)] = intro_samples
+    if mixed_samples is None:
+        overlay_bed(speech_samples, len(speech), conform(bgm, frame_rate, channels),
+                    frame_rate, mixed_region)
+    else:
+        mixed_region[:] = mixed_samples
+    final[len(final) - len(outro_samples):] = outro_samples
+    return AudioSegment(data=final.tobytes(), sample_width=2,
+                        frame_rate=frame_rate, channels=channels)
+
+
+def iter_chunks(segment: AudioSegment, frames: int = BLOCK_FRAMES) -> Iterator[AudioSegment]:
+    """Split an AudioSegment into consecutive pieces of at most `frames` frames."""
+    data = segment.raw_data
+    step = frames * segment.frame_width
+    for start in range(0, len(data), step):
+        yield segment._spawn(data[start:start + step])  # pylint: disable=protected-access
+
+
+class FormatConverter:
+    """
+    Converts int16 audio between formats chunk by chunk.
+
+    Applies the same audioop calls as pydub's set_channels/set_frame_rate but carries the
+    resampler state across chunks, so the concatenated output is identical to converting
+    the whole recording at once.
+    """
+
+    def __init__(self, frame_rate: int, channels: int, target_rate: int,
+                 target_channels: int) -> None:
+        self.frame_rate: int = frame_rate
+        self.channels: int = channels
+        self.target_rate: int = target_rate
+        self.target_channels: int = target_channels
+        self._state = None
+
+    def convert(self, data: bytes) -> np.ndarray:
+        """Convert raw int16 frames and return them as a (frames, channels) array."""
+        if self.channels == 1 and self.target_channels == 2:
+            data = audioop.tostereo(data, 2, 1, 1)
+        elif self.channels == 2 and self.target_channels == 1:
+            data = audioop.tomono(data, 2, 0.5, 0.5)
+        if self.frame_rate != self.target_rate and data:
+            data, self._state = audioop.ratecv(data, 2, self.target_channels, self.frame_rate,
+                                               self.target_rate, self._state)
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, self.target_channels)
+
+
+class StreamingMixer:
+    """
+    Mixes an episode incrementally as speech arrives.
+
+    Speech chunks are converted, mixed with the looped music bed and returned as soon as
+    they are far enough from the end not to be touched by the tail fade. Only the last
+    few seconds of speech are held back until `finish()`, when the total length is known.
+    The concatenated output matches `mix_episode()` exactly.
+    """
+
+    def __init__(self, bgm: AudioAsset, intro: AudioAsset, outro: AudioAsset,
+                 speech_frame_rate: int = 24000, speech_channels: int = 1) -> None:
+        self.speech_frame_rate: int = speech_frame_rate
+        self.speech_channels: int = speech_channels
+        self.mix_rate: int = max(speech_frame_rate, bgm.frame_rate)
+        self.mix_channels: int = max(speech_channels, bgm.channels)
+        self.frame_rate: int = max(intro.frame_rate, self.mix_rate, outro.frame_rate)
+        self.channels: int = max(intro.channels, self.mix_channels, outro.channels)
+
+        self._intro: np.ndarray = conform(intro, self.frame_rate, self.channels)
+        self._outro: np.ndarray = conform(outro, self.frame_rate, self.channels)
+        self._tile: np.ndarray = build_bgm_tile(conform(bgm, self.mix_rate, self.mix_channels),
+                                                self.mix_rate)
+        self._speech_converter = FormatConverter(speech_frame_rate, speech_channels,
+                                                 self.mix_rate, self.mix_channels)
+        self._output_converter = FormatConverter(self.mix_rate, self.mix_channels,
+                                                 self.frame_rate, self.channels)
+        # Frames that might still be changed by the tail fade, plus a small safety margin
+        self._holdback: int = ms_to_frames(BGM_TAIL_FADE_MS + 50, self.mix_rate)
+        self._pending: np.ndarray = np.empty((0, self.mix_channels), dtype=np.int16)
+        self._position: int = 0
+        self._input_frames: int = 0
+
+    def start(self) -> Iterator[np.ndarray]:
+        """Yield the intro."""
+        for first in range(0, len(self._intro), BLOCK_FRAMES):
+            yield self._intro[first:first + BLOCK_FRAMES]
+
+    def feed(self, speech: AudioSegment) -> Iterator[np.ndarray]:
+        """Add the next piece of speech and yield any output that is now final."""
+        speech = (speech.set_channels(self.speech_channels)
+                  .set_frame_rate(self.speech_frame_rate)
+                  .set_sample_width(2))
+        self._input_frames += int(speech.frame_count())
+        converted = self._speech_converter.convert(speech.raw_data)
+        self._pending = np.concatenate([self._pending, converted])
+
+        ready = len(self._pending) - self._holdback
+        if ready > 0:
+            block = add_clipped(self._pending[:ready],
+                                bed_frames(self._tile, sys.maxsize,
+                                           self._position, self._position + ready))
+            self._pending = self._pending[ready:]
+            self._position += ready
+            yield self._output_converter.convert(block.tobytes())
+
+    def finish(self) -> Iterator[np.ndarray]:
+        """Mix the held-back speech with the tail fade, then yield it and the outro."""
+        total_frames = self._position + len(self._pending)
+        speech_ms = frames_to_ms(self._input_frames, self.speech_frame_rate)
+        output_frames = sliced_length(total_frames, self.mix_rate)
+
+        tail = np.zeros((output_frames - self._position, self.mix_channels), dtype=np.int16)
+        available = min(len(self._pending), len(tail))
+        tail[:available] = self._pending[:available]
+
+        fade = tail_fade(speech_ms, self.mix_rate)
+        if fade is not None:
+            looped_frames = loop_count(len(self._tile), self.mix_rate, speech_ms) * len(self._tile)
+            stop = min(output_frames, fade.length)
+            if stop > self._position:
+                bed = bed_frames(self._tile, looped_frames, self._position, stop)
+                if not fade.is_identity(self._position, stop):
+                    bed = scale(bed, fade.gains(self._position, stop))
+                tail[:stop - self._position] = add_clipped(tail[:stop - self._position], bed)
+
+        self._pending = self._pending[:0]
+        self._position = output_frames
+        for first in range(0, len(tail), BLOCK_FRAMES):
+            yield self._output_converter.convert(tail[first:first + BLOCK_FRAMES].tobytes())
+        for first in range(0, len(self._outro), BLOCK_FRAMES):
+            yield self._outro[first:first + BLOCK_FRAMES]
+
+    def mix(self, speech_chunks: Iterable[AudioSegment]) -> Iterator[np.ndarray]:
+        """Yield the whole episode, block by block, from an iterable of speech pieces."""
+        yield from self.start()
+        for chunk in speech_chunks:
+            yield from self.feed(chunk)
+        yield from self.finish()
+
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
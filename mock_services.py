@@ -0,0 +1,208 @@
+"""
+Local stand-ins for NewsAPI, publisher article pages and the OpenAI API.
+
+Used by the benchmark harness so the pipeline can be measured offline. Every endpoint
+waits for a configurable latency and returns payloads of a configurable size:
+
+- GET  /v2/top-headlines       NewsAPI-style JSON pointing at the article pages below
+- GET  /articles/<n>           HTML article page
+- POST /v1/chat/completions    Chat completion, plain JSON or server-sent events
+- POST /v1/audio/speech        Raw 24 kHz 16-bit mono PCM paced like the input text (the
+                               same audio as tts.ToneTTSBackend)
+"""
+
+# Python standard libraries
+import json
+import math
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+# Local imports
+from tts import tone_pcm
+
+WORDS: list[str] = ("the council said on tuesday that officials would review the new policy "
+                    "after markets closed higher while analysts expect further gains in the "
+                    "coming weeks as residents gathered downtown to hear the announcement").split()
+
+
+@dataclass
+class MockConfig:
+    """Latency and payload settings shared by all mock endpoints."""
+    latency_ms: float = 50.0  # Added to every response
+    article_count: int = 6  # Articles returned by /v2/top-headlines
+    article_paragraphs: int = 12  # <p> elements per article page
+    script_paragraphs: int = 7  # Paragraphs in a generated script
+    words_per_paragraph: int = 60
+    tokens_per_second: float = 400.0  # Streaming speed of chat completions
+    tts_ms_per_char: float = 60.0  # Length of synthesized audio per input character
+    tts_seconds_per_char: float = 0.0005  # Extra synthesis time per input character
+
+
+def sentence(seed: int, words: int = 12) -> str:
+    """Return deterministic filler text."""
+    text = " ".join(WORDS[(seed * 7 + i) % len(WORDS)] for i in range(words))
+    return text[0].upper() + text[1:] + "."
+
+def paragraph(seed: int, words: int) -> str:
+    """Return a paragraph of roughly `words` words made of filler sentences."""
+    return " ".join(sentence(seed + i) for i in range(max(1, math.ceil(words / 12))))
+
+
+def article_page(seed: int, paragraphs: int, words: int) -> str:
+    """
+    Return an HTML article page with the boilerplate of a typical news site around it.
+    """
+    body = "".join(f"<p>{paragraph(seed + i, words)}</p>" for i in range(paragraphs))
+    links = "".join(f'<li><a href="/section/{i}">{sentence(seed + i, 2)}</a></li>'
+                    for i in range(30))
+    related = "".join(f'<li><a href="/articles/{seed + i}">{sentence(seed + i, 8)}</a></li>'
+                      for i in range(1, 6))
+    return (f"<html><head><title>{sentence(seed, 8)}</title>"
+            f"<script>window.analytics = {{id: {seed}}};</script>"
+            f"<style>body {{ font-family: serif; }}</style></head><body>"
+            f'<header class="site-header"><p>Publisher {seed}</p></header>'
+            f'<nav class="main-menu"><ul>{links}</ul><p><a href="/">Home</a> | '
+            f'<a href="/world">World</a> | <a href="/business">Business</a></p></nav>'
+            f'<div class="page with-sidebar"><article class="story-body">'
+            f"<h1>{sentence(seed, 8)}</h1>{body}"
+            f'<div class="share-tools"><p>Share this article</p></div></article>'
+            f'<aside class="related"><ul>{related}</ul></aside></div>'
+            f'<div class="newsletter-signup"><p>Sign up for our daily newsletter.</p></div>'
+            f"<footer><p>Copyright Publisher {seed}</p></footer></body></html>")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler serving every mock endpoint from the server's MockConfig."""
+    server: "MockServer"
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        pass  # Keep benchmark output clean
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Serve NewsAPI headlines and article pages."""
+        config = self.server.config
+        time.sleep(config.latency_ms / 1000)
+        base = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+
+        if self.path.startswith("/v2/top-headlines"):
+            self._send_json({
+                "status": "ok",
+                "totalResults": config.article_count,
+                "articles": [{
+                    "source": {"id": None, "name": f"Publisher {i}"},
+                    "title": sentence(i, 8),
+                    "description": sentence(i + 1),
+                    "url": f"{base}/articles/{i}",
+                    "publishedAt": "2025-01-01T00:00:00Z",
+                } for i in range(config.article_count)],
+            })
+        elif self.path.startswith("/articles/"):
+            seed = int(self.path.rsplit("/", 1)[-1] or 0)
+            page = article_page(seed, config.article_paragraphs, config.words_per_paragraph)
+            self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Serve chat completions and speech synthesis."""
+        config = self.server.config
+        request = self._read_json()
+        time.sleep(config.latency_ms / 1000)
+
+        if self.path.endswith("/chat/completions"):
+            self._chat_completion(request)
+        elif self.path.endswith("/audio/speech"):
+            text: str = request.get("input", "")
+            time.sleep(len(text) * config.tts_seconds_per_char)
+            self._send(200, tone_pcm(text, config.tts_ms_per_char), "audio/pcm")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _chat_completion(self, request: Dict[str, Any]) -> None:
+        config = self.server.config
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request["messages"])
+        if any("title" in str(m.get("content", "")) for m in request["messages"][:1]):
+            content = sentence(prompt_tokens, 8)
+        else:
+            content = "\n\n".join(paragraph(i, config.words_per_paragraph)
+                                  for i in range(config.script_paragraphs))
+        completion_tokens = len(content.split())
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        header = {"id": "chatcmpl-mock", "created": int(time.time()), "model": request["model"]}
+
+        if not request.get("stream"):
+            time.sleep(completion_tokens / config.tokens_per_second)
+            self._send_json({**header, "object": "chat.completion", "usage": usage, "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = content.split(" ")
+        for i in range(0, len(words), 5):
+            time.sleep(5 / config.tokens_per_second)
+            piece = " ".join(words[i:i + 5]) + (" " if i + 5 < len(words) else "")
+            self._event({**header, "object": "chat.completion.chunk", "choices": [{
+                "index": 0, "delta": {"content": piece}, "finish_reason": None,
+            }]})
+        if request.get("stream_options", {}).get("include_usage"):
+            self._event({**header, "object": "chat.completion.chunk", "choices": [],
+                         "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _event(self, payload: Dict[str, Any]) -> None:
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded HTTP server hosting all mock endpoints on localhost."""
+    daemon_threads = True
+
+    def __init__(self, config: Optional[MockConfig] = None, port: int = 0) -> None:
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.config: MockConfig = config or MockConfig()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the server, e.g. http://127.0.0.1:54321."""
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self) -> "MockServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run benchmark.py instead.")
+    sys.exit(1)
@@ -6,73 +6,165 @@ Provides functionality to retrieve full articles and format them for further pro
 # Python Standard Libraries
 import os
 import sys
-from typing import List, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Optional
+from urllib.parse import urlparse
 
 # 3rd party imports
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
+# Local imports
+from http_cache import cached_get, NEWS_API_TTL, ARTICLE_TTL
+from article_extractor import extract_article
 
-def get_full_article(url: str) -> str:
+NEWS_API_URL: str = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/top-headlines")
+ARTICLE_FAILED_MESSAGE: str = ("Failed to retrieve full article. Just read the headline and "
+                               "existing content instead and move on.")
+NO_URL_MESSAGE: str = "No URL available."
+
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """
+    Create a requests session that reuses connections across article fetches.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_full_article(url: str,
+                     session: Optional[requests.Session] = None,
+                     use_cache: bool = True) -> str:
     """
     Fetch and extract the full text of an article given its URL.
+
+    Only the page's main content is kept; see article_extractor.py.
     """
     try:
-        response = requests.get(url, timeout=10)
+        response = cached_get(url, session=session, ttl=ARTICLE_TTL, bypass=not use_cache)
         if response.status_code != 200:
             return "Failed to retrieve full article."
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        paragraphs = [p.get_text() for p in soup.find_all("p")]
-        return "\n".join(paragraphs)
-    except requests.RequestException as e:
-        return "Failed to retrieve full article. Just read the headline and existing content instead and move on."
+        return extract_article(response.text)
+    except requests.RequestException:
+        return ARTICLE_FAILED_MESSAGE
 
-def fetch_news(country: str = "us", max_articles: int = 5) -> List[Dict[str, str]]:
+def get_full_articles(urls: List[str],
+                      session: Optional[requests.Session] = None,
+                      max_workers: int = 8,
+                      per_host_limit: int = 2,
+                      deadline: float = 20.0,
+                      use_cache: bool = True) -> List[str]:
     """
-    Fetches top headlines from NewsAPI for a country and returns a structured list of articles.
-    Spinner is recommended for this function.
+    Fetch several articles concurrently and return their text in the same order as `urls`.
 
-    :param country: 2-letter ISO 3166-1 code of the country (e.g., 'us' for the United States)
-    :param max_articles: Maximum number of articles to fetch
-    :return: List of dictionaries containing publisher, headline, and full content
+    At most `per_host_limit` requests hit the same host at once. Articles that have not
+    finished once `deadline` seconds have passed get the fallback message instead, so a
+    single slow publisher cannot hold up the rest of the episode.
+    """
+    session = session or create_session(max_workers)
+    host_limits: Dict[str, threading.BoundedSemaphore] = {}
+    host_limits_lock = threading.Lock()
+
+    def fetch(url: str) -> str:
+        if not url:
+            return NO_URL_MESSAGE
+        host = urlparse(url).netloc
+        with host_limits_lock:
+            limit = host_limits.setdefault(host, threading.BoundedSemaphore(per_host_limit))
+        with limit:
+            return get_full_article(url, session, use_cache)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(fetch, url) for url in urls]
+        wait(futures, timeout=max(0.0, deadline))
+        return [
+            future.result() if future.done() and not future.exception() else ARTICLE_FAILED_MESSAGE
+            for future in futures
+        ]
+    finally:
+        # Don't wait for stragglers; their requests time out on their own
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def scrape_failed(content: str) -> bool:
+    """Return True if `content` is a placeholder for an article that could not be scraped."""
+    return content == NO_URL_MESSAGE or content.startswith("Failed to retrieve full article.")
+
+def fetch_headlines(country: str = "us",
+                    max_articles: int = 5,
+                    session: Optional[requests.Session] = None,
+                    use_cache: bool = True) -> List[Dict]:
+    """
+    Fetch the top headlines for a country from NewsAPI, without scraping the articles.
+
+    :return: The raw NewsAPI article entries (source, title, url, publishedAt, ...)
     """
-    url = "https://newsapi.org/v2/top-headlines"
     params = {
         "apiKey": os.getenv("NEWS_API_KEY"),
         "country": country,
         "pageSize": max_articles + 1,
     }
+    response = cached_get(NEWS_API_URL, params=params, session=session, ttl=NEWS_API_TTL,
+                          bypass=not use_cache)
+    data = response.json()
+
+    if response.status_code != 200 or data.get("status") != "ok":
+        raise requests.RequestException(
+            f"Failed to fetch news: {data.get('message', 'Unknown error')}"
+        )
+
+    articles = data.get("articles", [])
+    if not articles:
+        raise ValueError("No articles found in response")
+    return articles
+
+def structure_article(article: Dict, content: str) -> Dict[str, str]:
+    """Return the publisher, headline, URL and content of a NewsAPI article entry."""
+    return {
+        "publisher": article.get("source", {}).get("name", "Unknown Publisher"),
+        "headline": article.get("title", "No title available"),
+        "url": article.get("url", ""),
+        "content": content,
+    }
 
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-
-        if response.status_code != 200 or data.get("status") != "ok":
-            raise requests.RequestException(
-                f"Failed to fetch news: {data.get('message', 'Unknown error')}"
-            )
-
-        articles = data.get("articles", [])
-        if not articles:
-            raise ValueError("No articles found in response")
-
-        structured_articles: List[Dict[str, str]] = []
-
-        for article in articles:
-            publisher = article.get("source", {}).get("name", "Unknown Publisher")
-            headline = article.get("title", "No title available")
-            url = article.get("url", "")
-
-            full_content = get_full_article(url) if url else "No URL available."
+def fetch_news(country: str = "us",
+               max_articles: int = 5,
+               concurrent: bool = True,
+               deadline: float = 20.0,
+               use_cache: bool = True) -> List[Dict[str, str]]:
+    """
+    Fetches top headlines from NewsAPI for a country and returns a structured list of articles.
+    Spinner is recommended for this function.
 
-            structured_articles.append({
-                "publisher": publisher,
-                "headline": headline,
-                "content": full_content
-            })
+    :param country: 2-letter ISO 3166-1 code of the country (e.g., 'us' for the United States)
+    :param max_articles: Maximum number of articles to fetch
+    :param concurrent: Scrape the full articles in parallel instead of one at a time
+    :param deadline: Seconds to wait for all articles before falling back (concurrent mode only)
+    :param use_cache: Serve recent responses from the on-disk HTTP cache (False forces a refetch)
+    :return: List of dictionaries containing publisher, headline, and full content
+    """
+    started: float = time.monotonic()
 
-        return structured_articles
+    try:
+        session = create_session()
+        articles = fetch_headlines(country, max_articles, session, use_cache)
+
+        urls: List[str] = [article.get("url", "") for article in articles]
+        if concurrent:
+            remaining: float = deadline - (time.monotonic() - started)
+            contents = get_full_articles(urls, session=session, deadline=remaining,
+                                         use_cache=use_cache)
+        else:
+            contents = [get_full_article(u, session, use_cache) if u else NO_URL_MESSAGE
+                        for u in urls]
+
+        return [structure_article(article, content)
+                for article, content in zip(articles, contents)]
     except requests.RequestException as e:
         raise requests.RequestException(f"API request failed: {str(e)}") from e
 
@@ -0,0 +1,174 @@
+"""
+Shared OpenAI clients for every stage of the pipeline.
+
+Script writing, headlines, translation and speech synthesis all go through the clients
+returned here instead of building their own, so they share one pool of keep-alive
+connections (no repeated TCP/TLS setup), one retry policy and one view of the API's rate
+limits:
+
+- `get_client()` returns a pooled client; the pool size is set with
+  PODCAST_OPENAI_MAX_CONNECTIONS.
+- `with_retry()` retries rate-limited and transient failures with exponential backoff and
+  jitter, honoring Retry-After.
+- The `x-ratelimit-*` headers of every response are tracked, and new requests wait for the
+  window to reset once the remaining request or token budget reaches zero.
+"""
+
+# Python standard libraries
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+# 3rd party imports
+import httpx
+from openai import APIConnectionError, OpenAI
+
+# Local imports
+import metrics
+
+MAX_CONNECTIONS: int = int(os.getenv("PODCAST_OPENAI_MAX_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection stays open
+TIMEOUT: httpx.Timeout = httpx.Timeout(120.0, connect=10.0)
+RETRYABLE_STATUS_CODES: set[int] = {408, 409, 429, 500, 502, 503, 504}
+MAX_RETRIES: int = 5
+BASE_DELAY: float = 1.0
+
+T = TypeVar("T")
+
+
+def parse_reset(value: str) -> Optional[float]:
+    """Parse an OpenAI reset duration such as '1s', '6m0s' or '250ms' into seconds."""
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    parts = re.findall(r"([\d.]+)(ms|s|m|h)", value)
+    if not parts:
+        return None
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+@dataclass
+class RateLimitState:
+    """The most recent rate-limit budget reported by the API."""
+    remaining_requests: Optional[int] = None
+    remaining_tokens: Optional[int] = None
+    resume_at: float = 0.0  # Monotonic time before which no request should be sent
+
+    def update(self, headers: httpx.Headers) -> None:
+        """Record the budget from a response's `x-ratelimit-*` headers."""
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_requests is not None and remaining_requests.isdigit():
+            self.remaining_requests = int(remaining_requests)
+        if remaining_tokens is not None and remaining_tokens.isdigit():
+            self.remaining_tokens = int(remaining_tokens)
+
+        # Once a budget is used up, hold new requests until its window resets
+        waits = []
+        if self.remaining_requests == 0:
+            waits.append(parse_reset(headers.get("x-ratelimit-reset-requests", "")))
+        if self.remaining_tokens == 0:
+            waits.append(parse_reset(headers.get("x-ratelimit-reset-tokens", "")))
+        waits = [wait for wait in waits if wait]
+        if waits:
+            self.resume_at = max(self.resume_at, time.monotonic() + max(waits))
+
+    def wait_time(self) -> float:
+        """Return how long a new request should wait for the rate limit to reset."""
+        return max(0.0, self.resume_at - time.monotonic())
+
+
+_rate_limits = RateLimitState()
+_lock = threading.Lock()
+_clients: Dict[Tuple[int, Optional[str], Optional[str]], OpenAI] = {}
+
+
+def rate_limits() -> RateLimitState:
+    """Return the rate-limit budget shared by all clients in this process."""
+    return _rate_limits
+
+def _on_request(request: httpx.Request) -> None:
+    _ = request
+    wait = _rate_limits.wait_time()
+    if wait:
+        metrics.count("openai.rate_limit_waits")
+        with metrics.span("openai.rate_limit_wait"):
+            time.sleep(wait)
+
+def _on_response(response: httpx.Response) -> None:
+    metrics.count("openai.http_requests")
+    if response.status_code == 429:
+        metrics.count("openai.rate_limited")
+    _rate_limits.update(response.headers)
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY)
+
+def get_client() -> OpenAI:
+    """
+    Return the process-wide OpenAI client.
+
+    Clients are created per process (forked workers must not share sockets with their
+    parent) and per API key and base URL, read from the environment on first use.
+    Retries are left to `with_retry` so every caller gets the same backoff policy.
+    """
+    api_key, base_url = os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL")
+    key = (os.getpid(), api_key, base_url)
+    with _lock:
+        if key not in _clients:
+            http_client = httpx.Client(limits=_limits(), timeout=TIMEOUT, event_hooks={
+                "request": [_on_request], "response": [_on_response],
+            })
+            _clients[key] = OpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                   timeout=TIMEOUT, http_client=http_client)
+        return _clients[key]
+
+def retry_delay(error: Exception, attempt: int, base_delay: float = BASE_DELAY) -> Optional[float]:
+    """Return how long to wait before retrying after `error`, or None if it is not retryable."""
+    status_code: Optional[int] = getattr(error, "status_code", None)
+    if status_code not in RETRYABLE_STATUS_CODES and not isinstance(
+            error, (APIConnectionError, ConnectionError, TimeoutError)):
+        return None
+
+    # Honor the server's Retry-After header when it sends one
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return float(retry_after)
+    except ValueError:
+        pass
+
+    # Exponential backoff with jitter so parallel workers don't retry in lockstep
+    return base_delay * (2 ** attempt) * (0.5 + random.random())
+
+def with_retry(call: Callable[[], T], counter: str = "openai.retries",
+               max_retries: int = MAX_RETRIES, base_delay: float = BASE_DELAY) -> T:
+    """Run `call`, backing off and retrying on rate limits and transient errors."""
+    attempt: int = 0
+    while True:
+        try:
+            return call()
+        except Exception as error:  # pylint: disable=broad-except
+            delay = retry_delay(error, attempt, base_delay)
+            if delay is None or attempt >= max_retries:
+                raise
+            metrics.count(counter)
+            time.sleep(delay)
+            attempt += 1
+
+def record_usage(usage: Any) -> None:
+    """Add a completion's token usage to the current run report."""
+    metrics.count("llm.calls")
+    if usage is not None:
+        metrics.count("llm.prompt_tokens", usage.prompt_tokens)
+        metrics.count("llm.completion_tokens", usage.completion_tokens)
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
@@ -0,0 +1,391 @@
+"""
+Checkpointed stage graph for producing an episode.
+
+    fetch -> script -> headline -----------.
+                   `-> speech -> mix -> export
+
+Every run gets a directory `runs/<run-id>/` holding the output of each stage (news.json,
+script.json, headline.json, speech.wav, episode.mp3, export.json) and a manifest.json that
+records, per stage, a hash of its inputs and a hash of its output. Resuming a run
+(`python main.py resume <run-id>`) skips every stage whose inputs hash the same as when
+it last completed and whose output is still intact, so a run that failed while mixing picks
+up from the saved speech instead of calling the news, LLM and TTS APIs again.
+
+Extra delivery renditions (see `audio_merge.RENDITIONS`) are encoded by the mix stage in the
+same pass as episode.mp3, into `renditions/`, and published next to the episode.
+
+The modules that do the work (and their dependencies: openai, pydub, BeautifulSoup) are
+only imported by the stages that use them, so inspecting or planning runs starts quickly.
+"""
+
+# Python standard libraries
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import time
+import uuid
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple)
+
+# Local imports
+import metrics
+from terminal import Item, spinner
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+# Stages import their modules when they run (see the module docstring)
+# pylint: disable=import-outside-toplevel
+
+RUNS_DIR: Path = Path(__file__).parent / "runs"
+MANIFEST_FILE: str = "manifest.json"
+KEEP_RUNS: int = 20  # Older run directories are removed when a new run starts
+PIPELINE_VERSION: int = 1  # Bump to invalidate recorded stages after incompatible changes
+RENDITIONS_DIR: str = "renditions"
+RENDITIONS_INDEX: str = "index.json"  # Maps each rendition to its file in RENDITIONS_DIR
+
+
+def _renditions_intact(path: Path) -> bool:
+    manifest = json.loads((path.parent / MANIFEST_FILE).read_text(encoding="utf-8"))
+    names: List[str] = manifest["params"].get("renditions") or []
+    index_path = path.parent / RENDITIONS_DIR / RENDITIONS_INDEX
+    if not names:
+        return True
+    if not index_path.exists():
+        return False
+    index = json.loads(index_path.read_text(encoding="utf-8"))
+    return all(name in index and (path.parent / RENDITIONS_DIR / index[name]).exists()
+               for name in names)
+
+def _export_intact(path: Path) -> bool:
+    export = json.loads(path.read_text(encoding="utf-8"))
+    return all(Path(published).exists()
+               for published in [export["path"], *export.get("renditions", {}).values()])
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of the pipeline and the file it produces."""
+    name: str
+    artifact: str  # File name inside the run directory
+    label: str  # Shown while the stage runs
+    done: str  # Shown once it has finished
+    inputs: Tuple[str, ...] = ()  # Stages whose output this one reads
+    params: Tuple[str, ...] = ()  # Run parameters the output depends on
+    verify: Optional[Callable[[Path], bool]] = None  # Extra check that the output is usable
+
+
+STAGES: Dict[str, Stage] = {stage.name: stage for stage in [
+    Stage("fetch", "news.json", "Fetching news", "News fetched!",
+          params=("country", "max_articles", "new_only")),
+    Stage("script", "script.json", "Writing script", "Script written!", ("fetch",), ("voice",)),
+    Stage("headline", "headline.json", "Writing headline", "Headline written!", ("script",)),
+    Stage("speech", "speech.wav", "Synthesizing speech", "Speech synthesized!", ("script",)),
+    Stage("mix", "episode.mp3", "Generating final audio", "Final audio generated!",
+          ("speech",), ("bgm_path", "renditions"), verify=_renditions_intact),
+    Stage("export", "export.json", "Exporting episode", "Episode exported!",
+          ("mix", "headline"), ("renditions",), verify=_export_intact),
+]}
+
+
+def content_hash(path: Path) -> str:
+    """Return the SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def prune_runs(keep: int = KEEP_RUNS) -> None:
+    """Remove all but the `keep` most recently modified run directories."""
+    if not RUNS_DIR.is_dir():
+        return
+    runs = sorted((path for path in RUNS_DIR.iterdir() if (path / MANIFEST_FILE).exists()),
+                  key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in runs[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def list_runs() -> List[str]:
+    """Return the ids of the recorded runs, oldest first."""
+    if not RUNS_DIR.is_dir():
+        return []
+    return sorted(path.name for path in RUNS_DIR.iterdir() if (path / MANIFEST_FILE).exists())
+
+
+class PipelineRun:
+    """The artifacts and manifest of one run, in `runs/<run-id>/`."""
+
+    def __init__(self, run_id: str, manifest: Dict[str, Any]) -> None:
+        self.run_id: str = run_id
+        self.directory: Path = RUNS_DIR / run_id
+        self.manifest: Dict[str, Any] = manifest
+
+    @classmethod
+    def create(cls, country: str = "us", max_articles: int = 5, new_only: bool = False,
+               voice: Optional[str] = None, bgm_path: Optional[str] = None,
+               renditions: Optional[List[str]] = None) -> "PipelineRun":
+        """
+        Start a new run with the given parameters.
+
+        `renditions` defaults to the ones listed in PODCAST_RENDITIONS.
+        """
+        from audio_merge import background_music_files, get_renditions
+        prune_runs(KEEP_RUNS - 1)
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        params = {
+            "country": country,
+            "max_articles": max_articles,
+            "new_only": new_only,
+            "voice": voice,
+            # Chosen once so a resumed run mixes with the same track
+            "bgm_path": bgm_path or random.choice(background_music_files()),
+            "renditions": [rendition.name for rendition in get_renditions(renditions)],
+        }
+        run = cls(run_id, {"run_id": run_id, "created": time.time(), "params": params,
+                           "stages": {}})
+        run.directory.mkdir(parents=True)
+        run.save()
+        return run
+
+    @classmethod
+    def load(cls, run_id: str) -> "PipelineRun":
+        """Open an earlier run to resume or inspect it."""
+        manifest_path = RUNS_DIR / run_id / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"No run '{run_id}' in '{RUNS_DIR}'")
+        return cls(run_id, json.loads(manifest_path.read_text(encoding="utf-8")))
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """The parameters the run was created with."""
+        return self.manifest["params"]
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        partial = self.directory / f".{MANIFEST_FILE}.{uuid.uuid4().hex}"
+        partial.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        os.replace(partial, self.directory / MANIFEST_FILE)
+
+    def path(self, name: str) -> Path:
+        """Return where the output of stage `name` is stored."""
+        return self.directory / STAGES[name].artifact
+
+    def partial_path(self, name: str) -> Path:
+        """Return the temporary path a stage writes to before its output is committed."""
+        return self.directory / f"partial-{STAGES[name].artifact}"
+
+    def input_hash(self, name: str) -> Optional[str]:
+        """Hash the stage's parameters and input outputs, or None if an input is missing."""
+        stage = STAGES[name]
+        records = self.manifest["stages"]
+        if any(dep not in records for dep in stage.inputs):
+            return None
+        payload = json.dumps([PIPELINE_VERSION, name,
+                              {key: self.params.get(key) for key in stage.params},
+                              [records[dep]["output_hash"] for dep in stage.inputs]])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_current(self, name: str) -> bool:
+        """Return True if the stage's recorded output is intact and its inputs are unchanged."""
+        record = self.manifest["stages"].get(name)
+        path = self.path(name)
+        if record is None or record["input_hash"] != self.input_hash(name) or not path.exists():
+            return False
+        if content_hash(path) != record["output_hash"]:
+            return False
+        verify = STAGES[name].verify
+        return verify is None or verify(path)
+
+    def stage_status(self, name: str) -> str:
+        """
+        Return 'done' if the stage would be reused, 'stale' if it completed but would run
+        again (its inputs changed or its output is damaged), or 'pending'.
+        """
+        if name not in self.manifest["stages"]:
+            return "pending"
+        return "done" if self.is_current(name) else "stale"
+
+    def commit(self, name: str, seconds: Optional[float] = None) -> None:
+        """Record the stage's output (moving it into place from its partial path)."""
+        if self.partial_path(name).exists():
+            os.replace(self.partial_path(name), self.path(name))
+        self.manifest["stages"][name] = {
+            "input_hash": self.input_hash(name),
+            "output_hash": content_hash(self.path(name)),
+            "completed": time.time(),
+            "seconds": seconds,
+        }
+        self.save()
+
+    def write_json(self, name: str, data: Any) -> None:
+        """Write a JSON stage output to the stage's partial path."""
+        self.partial_path(name).write_text(json.dumps(data, ensure_ascii=False, indent=2),
+                                           encoding="utf-8")
+
+    def read_json(self, name: str) -> Any:
+        """Read a committed JSON stage output."""
+        return json.loads(self.path(name).read_text(encoding="utf-8"))
+
+    def run_stage(self, name: str, produce: Callable[[Path], None]) -> Path:
+        """
+        Run stage `name` unless its recorded output is still current, and return the output.
+
+        `produce` is given the partial path to write the output to.
+        """
+        stage = STAGES[name]
+        if self.is_current(name):
+            metrics.count("pipeline.stages_reused")
+            Item.skipped(f"{stage.label}: reused from run {self.run_id}", indent=False)
+            return self.path(name)
+        started = time.perf_counter()
+        with spinner(f"{stage.label}...", stage.done):
+            produce(self.partial_path(name))
+        self.commit(name, time.perf_counter() - started)
+        return self.path(name)
+
+
+class WavRecorder:
+    """Passes speech segments through while writing them to a WAV file."""
+
+    def __init__(self, chunks: Iterable["AudioSegment"], path: Path) -> None:
+        self.chunks: Iterable["AudioSegment"] = chunks
+        self.path: Path = path
+        self.complete: bool = False
+
+    def __iter__(self) -> Iterator["AudioSegment"]:
+        writer: Optional[wave.Wave_write] = None
+        try:
+            for chunk in self.chunks:
+                if writer is None:
+                    writer = wave.open(str(self.path), "wb")
+                    writer.setnchannels(chunk.channels)
+                    writer.setsampwidth(chunk.sample_width)
+                    writer.setframerate(chunk.frame_rate)
+                writer.writeframes(chunk.raw_data)
+                yield chunk
+            self.complete = writer is not None
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+def _fetch(run: PipelineRun, output: Path) -> None:
+    from article_index import fetch_indexed_news
+    news = fetch_indexed_news(run.params["country"], run.params["max_articles"],
+                              new_only=run.params["new_only"])
+    output.write_text(json.dumps(news, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def _script(run: PipelineRun, _output: Path) -> None:
+    from ai_script_writer import generate_script
+    script, host_name = generate_script(run.read_json("fetch"), voice=run.params["voice"])
+    run.write_json("script", {"script": script, "host_name": host_name})
+
+def _headline(run: PipelineRun, _output: Path) -> None:
+    from ai_script_writer import create_headline_for_podcast
+    run.write_json("headline", {"headline": create_headline_for_podcast(
+        run.read_json("script")["script"])})
+
+def _speech(run: PipelineRun, output: Path) -> None:
+    from tts import gen_speech
+    script = run.read_json("script")
+    speech: "AudioSegment" = gen_speech(script["script"], script["host_name"], as_segment=True)
+    speech.export(output, format="wav")
+
+def _encode_mix(run: PipelineRun, speech: Any) -> None:
+    """Mix `speech` into the mix stage's partial output and encode the renditions with it."""
+    from audio_merge import get_renditions, mix_to_file
+    renditions = get_renditions(run.params.get("renditions") or [])
+    partial_dir = run.directory / f"partial-{RENDITIONS_DIR}"
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    mix_to_file(speech, str(run.partial_path("mix")), bgm_path=run.params["bgm_path"],
+                renditions=renditions, renditions_dir=str(partial_dir))
+
+    shutil.rmtree(run.directory / RENDITIONS_DIR, ignore_errors=True)
+    if renditions:
+        (partial_dir / RENDITIONS_INDEX).write_text(json.dumps(
+            {rendition.name: rendition.file_name for rendition in renditions}), encoding="utf-8")
+        os.replace(partial_dir, run.directory / RENDITIONS_DIR)
+
+def _mix(run: PipelineRun, _output: Path) -> None:
+    _encode_mix(run, str(run.path("speech")))
+
+def _export(run: PipelineRun, _output: Path) -> None:
+    from audio_merge import publish_episode, publish_renditions
+    # The run keeps its own copy, so the episode can be exported again
+    title = run.read_json("headline")["headline"].capitalize()
+    path = publish_episode(str(run.path("mix")), title, move=False)
+    export: Dict[str, Any] = {"path": path}
+    if run.params.get("renditions"):
+        index_path = run.directory / RENDITIONS_DIR / RENDITIONS_INDEX
+        export["renditions"] = publish_renditions(
+            str(run.directory / RENDITIONS_DIR),
+            json.loads(index_path.read_text(encoding="utf-8")), path)
+    run.write_json("export", export)
+
+def run_staged(run: PipelineRun) -> Optional[str]:
+    """
+    Run (or resume) every stage in order and return the episode's path.
+
+    Returns None if there were no stories to cover.
+    """
+    run.run_stage("fetch", lambda output: _fetch(run, output))
+    if not run.read_json("fetch"):
+        return None
+    for name, produce in [("script", _script), ("headline", _headline), ("speech", _speech),
+                          ("mix", _mix), ("export", _export)]:
+        run.run_stage(name, lambda output, produce=produce: produce(run, output))
+    return run.read_json("export")["path"]
+
+def run_streaming(run: PipelineRun) -> Optional[str]:
+    """
+    Produce a new run's episode with the script, speech and mix stages overlapped.
+
+    The script is streamed from the model, each paragraph is synthesized as it arrives and
+    each speech segment is mixed and encoded as soon as it is ready. The script, speech and
+    mix are still recorded as stage outputs, as far as they got, so a failed run can be
+    resumed with `run_staged`.
+    """
+    from ai_script_writer import write_script_stream
+    from tts import iter_speech
+
+    run.run_stage("fetch", lambda output: _fetch(run, output))
+    news: List[Dict[str, Any]] = run.read_json("fetch")
+    if not news:
+        return None
+
+    script_stream = write_script_stream(news, voice=run.params["voice"])
+    script_lines = (line for paragraph in script_stream for line in paragraph.split('\n'))
+    speech = WavRecorder(iter_speech(script_lines, script_stream.host_name),
+                         run.partial_path("speech"))
+    started = time.perf_counter()
+    try:
+        with spinner("Writing script and generating audio...",
+                     "Script written and audio generated!"):
+            _encode_mix(run, speech)
+    finally:
+        # Keep whatever finished so a resumed run does not redo it
+        if script_stream.script:
+            run.write_json("script", {"script": script_stream.script,
+                                      "host_name": script_stream.host_name})
+            run.commit("script")
+            if speech.complete:
+                run.commit("speech")
+    run.commit("mix", time.perf_counter() - started)
+
+    # The headline was requested in the background as soon as the script was complete
+    with spinner("Writing headline...", "Headline written!"):
+        run.write_json("headline", {"headline": script_stream.headline()})
+    run.commit("headline")
+    run.run_stage("export", lambda output: _export(run, output))
+    return run.read_json("export")["path"]
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
@@ -0,0 +1,166 @@
+"""
+Per-run scratch directories under `.tmp`.
+
+Every run works in its own `.tmp/<prefix>-<id>/` directory holding a `lease.json` file.
+While the run is alive a background thread renews the lease, so other runs can tell which
+scratch directories are still in use. Cleanup only removes directories whose lease has
+expired, whose owning process has exited, or that have no lease at all, which lets any
+number of runs share one machine without deleting each other's files.
+"""
+
+# Python standard libraries
+import json
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SCRATCH_ROOT: Path = Path(__file__).parent / ".tmp"
+LEASE_FILE: str = "lease.json"
+LEASE_TTL: float = 120.0  # Seconds a lease stays valid without being renewed
+HEARTBEAT_INTERVAL: float = 30.0
+UNOWNED_GRACE: float = 3600.0  # Age after which files without a lease count as abandoned
+
+_current: Optional["ScratchDir"] = None
+
+
+def read_lease(path: Path) -> Optional[Dict[str, Any]]:
+    """Return the lease of a scratch directory, or None if it is missing or unreadable."""
+    try:
+        with open(path / LEASE_FILE, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def process_alive(pid: int) -> bool:
+    """Return True if a process with the given id exists on this machine."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # Exists but belongs to someone else (or cannot be checked)
+    return True
+
+def is_stale(path: Path, now: Optional[float] = None) -> bool:
+    """
+    Return True if a scratch entry is no longer owned by a live run.
+
+    An entry is stale when its lease has expired, when its owner ran on this host and has
+    exited, or when it has no lease and has not been modified for UNOWNED_GRACE seconds.
+    """
+    now = time.time() if now is None else now
+    lease = read_lease(path) if path.is_dir() else None
+    if lease is None:
+        try:
+            return now - path.stat().st_mtime > UNOWNED_GRACE
+        except FileNotFoundError:
+            return False
+    if lease.get("expires", 0) < now:
+        return True
+    return lease.get("host") == socket.gethostname() and not process_alive(lease.get("pid", 0))
+
+
+class ScratchDir:
+    """
+    A leased scratch directory for one run, removed again when the run finishes.
+
+    Use as a context manager; while it is open `scratch.current()` returns it, so helpers
+    such as `tts.gen_speech` write into the run's own directory.
+    """
+
+    def __init__(self, prefix: str = "run", root: Path = SCRATCH_ROOT, keep: bool = False):
+        self.run_id: str = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.path: Path = root / f"{prefix}-{self.run_id}"
+        self.keep: bool = keep
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._previous: Optional["ScratchDir"] = None
+
+    def renew(self) -> None:
+        """Write a fresh lease, extending ownership by LEASE_TTL seconds."""
+        now = time.time()
+        lease = {"pid": os.getpid(), "host": socket.gethostname(), "run_id": self.run_id,
+                 "renewed": now, "expires": now + LEASE_TTL}
+        temp_path = self.path / f".{LEASE_FILE}.{uuid.uuid4().hex}"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(lease, file)
+        os.replace(temp_path, self.path / LEASE_FILE)
+
+    def _beat(self) -> None:
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.renew()
+            except OSError:
+                pass  # Directory removed underneath us; the run will fail on its own
+
+    def open(self) -> "ScratchDir":
+        """Create the directory, take the lease and start renewing it."""
+        global _current  # pylint: disable=global-statement
+        self.path.mkdir(parents=True, exist_ok=False)
+        self.renew()
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True,
+                                           name=f"scratch-{self.run_id}")
+        self._heartbeat.start()
+        self._previous, _current = _current, self
+        return self
+
+    def close(self) -> None:
+        """Stop renewing the lease and remove the directory (unless `keep` is set)."""
+        global _current  # pylint: disable=global-statement
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        if _current is self:
+            _current = self._previous
+        if not self.keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def subdir(self, name: str) -> Path:
+        """Create and return a subdirectory of this scratch directory."""
+        path = self.path / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def __enter__(self) -> "ScratchDir":
+        return self.open()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def current() -> Optional[ScratchDir]:
+    """Return the scratch directory opened most recently in this process, if any."""
+    return _current
+
+def scratch_path() -> Path:
+    """Return the directory temporary files should go to for the current run."""
+    if _current is not None:
+        return _current.path
+    SCRATCH_ROOT.mkdir(exist_ok=True)
+    return SCRATCH_ROOT
+
+def remove_stale(root: Path = SCRATCH_ROOT) -> List[Path]:
+    """Remove every entry in `root` that is not owned by a live run and return them."""
+    if not root.is_dir():
+        return []
+    removed: List[Path] = []
+    now = time.time()
+    for entry in root.iterdir():
+        if not is_stale(entry, now):
+            continue
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink(missing_ok=True)
+        removed.append(entry)
+    return removed
+
+if __name__ == "__main__":
+    print("This script is not meant to be run directly. Run main.py instead.")
+    sys.exit(1)
@@ -6,6 +6,8 @@ import time
 import threading
 from typing import Generator
 
+from metrics import stage
+
 
 class Item:
     """Utility class for displaying status messages with colored symbols."""
@@ -88,6 +90,8 @@ def await_press_enter() -> None:
 def spinner(message: str = "Loading", complete_message: str = None) -> Generator[None, None, None]:
     """Display a spinner while executing a block of code.
 
+    The block is also recorded as a stage in the current run report (see metrics.py).
+
     Args:
         message: The message to display while spinning
         complete_message: The message to display when complete (defaults to message)
@@ -112,17 +116,21 @@ def spinner(message: str = "Loading", complete_message: str = None) -> Generator
                 print(f"\r{frame} {message.removesuffix('...')}...", end="", flush=True)
                 time.sleep(0.1)
 
+    # Only animate on a terminal; logs (e.g. a worker's job logs) get the final line only
     spinner_thread = threading.Thread(target=spin)
-    spinner_thread.start()
+    if sys.stdout.isatty():
+        spinner_thread.start()
     start_time: float = time.time()
     try:
-        yield
+        with stage(message.removesuffix("...")):
+            yield
     except (KeyboardInterrupt, Exception) as e:
         resulted_in_error = True
         raise e
     finally:
         stop_spinner.set()
-        spinner_thread.join()
+        if spinner_thread.is_alive():
+            spinner_thread.join()
         print("\r\033[K", end="", flush=True)
         Cursor.show()
         elapsed_time = f" ({round(time.time() - start_time, 2)} s)"
@@ -1,28 +1,93 @@
 """
 This module provides translation functionality using OpenAI's GPT models.
 It contains utilities to translate text content between different languages.
+
+Scripts are translated paragraph by paragraph in parallel. Every translated paragraph is
+kept in a persistent translation memory keyed by the paragraph and target language, so
+recurring text (the host's intro and sign-off, re-runs, several editions of one episode)
+is only ever translated once.
 """
 
-import os
+import re
 import sys
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import metrics
+from cache import DiskCache
+from openai_client import get_client, record_usage, with_retry
+
+TRANSLATION_MODEL: str = "gpt-4o-mini"
+PARAGRAPH_SEPARATOR = re.compile(r"(\n\s*\n)")
+
+_translation_memory: Optional[DiskCache] = None
 
-def translate_text(script: str, target_language: str) -> str:
+
+def get_translation_memory() -> DiskCache:
+    """Return the shared cache of translated paragraphs."""
+    global _translation_memory  # pylint: disable=global-statement
+    if _translation_memory is None:
+        _translation_memory = DiskCache("translation", max_bytes=64 * 1024 * 1024)
+    return _translation_memory
+
+def translate_paragraph(paragraph: str, target_language: str, use_cache: bool = True) -> str:
+    """
+    Translate a single paragraph, reusing the translation memory when possible.
+    """
+    memory = get_translation_memory()
+    key = DiskCache.make_key(TRANSLATION_MODEL, target_language.strip().lower(),
+                             DiskCache.make_key(paragraph.strip()))
+    cached = memory.get(key) if use_cache else None
+    if cached is not None:
+        metrics.count("translation.memory_hits")
+        return cached.decode("utf-8")
+
+    client = get_client()
+    with metrics.span("openai.chat.translate"):
+        response = with_retry(lambda: client.chat.completions.create(
+            model=TRANSLATION_MODEL,
+            messages=[
+                {"role": "system", "content": f"Translate this text into: {target_language}"},
+                {"role": "system", "content": ("The text is one paragraph of a news podcast "
+                                               "script. Reply with the translation only.")},
+                {"role": "user", "content": paragraph}
+            ],
+            temperature=0.5 # Slightly lower temperature to ensure more accurate translations
+        ))
+    record_usage(response.usage)
+
+    translated: str = response.choices[0].message.content.strip()
+    if use_cache:
+        memory.set(key, translated.encode("utf-8"), {"language": target_language})
+    return translated
+
+def translate_text(script: str, target_language: str, max_workers: int = 8,
+                   use_cache: bool = True) -> str:
     """
     Translate the given script into target_language.
+
+    The script is split at its blank lines and the paragraphs are translated concurrently,
+    then put back together in their original order. Paragraphs that were translated before
+    come from the translation memory. If a paragraph fails, the others are still stored in
+    the memory before the error is raised, so a retry only repeats the failed ones.
     """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": f"Translate this text into: {target_language}"},
-            {"role": "user", "content": script}
-        ],
-        temperature=0.5 # Slightly lower temperature to ensure more accurate translations
-    )
+    parts: List[str] = PARAGRAPH_SEPARATOR.split(script)
+    paragraphs = list(dict.fromkeys(part for i, part in enumerate(parts)
+                                    if i % 2 == 0 and part.strip()))
+    metrics.count("translation.paragraphs", len(paragraphs))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paragraphs)))) as executor:
+        futures = {paragraph: executor.submit(translate_paragraph, paragraph, target_language,
+                                              use_cache)
+                   for paragraph in paragraphs}
+        wait(futures.values())
+    translations: Dict[str, str] = {paragraph: future.result()
+                                    for paragraph, future in futures.items()}
 
-    translated_script: str = response.choices[0].message.content
+    # Separators (odd indices) and blank parts are kept as they were
+    translated_script: str = "".join(
+        translations.get(part, part) if i % 2 == 0 else part for i, part in enumerate(parts)
+    )
     return translated_script
 
 if __name__ == "__main__":
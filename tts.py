@@ -9,49 +9,361 @@ Main features:
 - Text to speech conversion using OpenAI's TTS API
 - Support for different voices
 - Automatic handling of line breaks
-- Temporary file management for audio processing
+- Concurrent synthesis with retry and backoff on rate limits
+- Request packing: consecutive lines are sent as one request, up to the model's input limit,
+  with the usual pause added between requests
+- Streaming synthesis that yields audio in script order as lines finish
+- Persistent cache of synthesized lines keyed by model, voice and text
+- Pluggable backends, including an offline stand-in for testing
+- Raw PCM hand-off so audio is only encoded once, at the final export
 """
 
 # Python standard libraries
-from typing import Any
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Protocol, Union
+import array
+import io
+import math
+import random
+import time
 import uuid
-import os
 import sys
+import zlib
 from pathlib import Path
 
 # 3rd party imports
-from openai import OpenAI
 from pydub import AudioSegment
 
-def gen_speech(text: str, voice: str = "nova") -> str:
+# Local imports
+from cache import DiskCache
+from condense import split_sentences
+import metrics
+from openai_client import get_client, with_retry
+from scratch import scratch_path
+
+OPENAI_PCM_FRAME_RATE: int = 24000  # OpenAI's "pcm" format is 24 kHz, 16-bit, mono
+MAX_INPUT_CHARS: int = 4096  # Longest input the TTS API accepts in one request
+LINE_SEPARATOR: str = "\n\n"  # Joins packed lines; the model pauses between paragraphs
+_speech_cache: Optional[DiskCache] = None
+
+
+def get_speech_cache() -> DiskCache:
+    """Return the shared cache of decoded speech segments."""
+    global _speech_cache  # pylint: disable=global-statement
+    if _speech_cache is None:
+        _speech_cache = DiskCache("tts", max_bytes=512 * 1024 * 1024)
+    return _speech_cache
+
+
+class TTSBackend(Protocol):
+    """Interface for anything that can turn a line of text into audio bytes."""
+    audio_format: str  # "pcm" for raw 16-bit mono samples, otherwise a format ffmpeg can decode
+    model: str
+    frame_rate: int  # Only used for "pcm" audio
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        """Return the encoded audio for `text` spoken by `voice`."""
+
+
+class OpenAITTSBackend:
+    """Backend that synthesizes speech with OpenAI's TTS API as raw PCM."""
+    audio_format: str = "pcm"
+    frame_rate: int = OPENAI_PCM_FRAME_RATE
+
+    def __init__(self, model: str = "tts-1") -> None:
+        # Shared pooled client; retries are applied per line by synthesize_with_retry
+        self.client: Any = get_client()
+        self.model: str = model
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        """Return `text` spoken by `voice` as raw 16-bit mono PCM."""
+        with metrics.span("openai.tts"):
+            response = self.client.audio.speech.create(
+                model=self.model,
+                voice=voice,
+                input=text,
+                response_format="pcm"
+            )
+            return response.content
+
+
+def tone_pcm(text: str, ms_per_char: float = 60.0,
+             frame_rate: int = OPENAI_PCM_FRAME_RATE) -> bytes:
     """
-    Generate speech audio from given text using OpenAI TTS API.
+    Return a quiet 220 Hz tone paced like `text` read aloud, as raw 16-bit mono PCM.
+
+    Each sentence is a burst of tone sized to its length (give or take 20%), followed by a
+    pause of 150-450 ms, or 300-900 ms at the end of a paragraph. The result only depends on
+    the text.
+    """
+    rng = random.Random(zlib.crc32(text.encode("utf-8")))
+    chunks: List[bytes] = []
+    for index, paragraph in enumerate(text.split(LINE_SEPARATOR)):
+        for position, sentence in enumerate(split_sentences(paragraph)):
+            if index or position:
+                pause_ms = rng.uniform(150, 450) if position else rng.uniform(300, 900)
+                chunks.append(b"\x00\x00" * int(pause_ms * frame_rate / 1000))
+            frame_count = int(len(sentence) * ms_per_char * rng.uniform(0.8, 1.2)
+                              * frame_rate / 1000)
+            chunks.append(array.array("h", (
+                int(2000 * math.sin(2 * math.pi * 220 * i / frame_rate))
+                for i in range(frame_count)
+            )).tobytes())
+    return b"".join(chunks)
+
+
+class ToneTTSBackend:
     """
-    client: Any = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    cache_dir: Path = Path(__file__).parent / ".tmp"
-    cache_dir.mkdir(exist_ok=True)
+    Offline stand-in backend that returns a quiet tone instead of speech.
+
+    The tone is paced like the text read aloud (see `tone_pcm`), so timing and ordering
+    behave like the real API.
+    Useful for tests and benchmarks that should not depend on the network.
+    """
+    audio_format: str = "pcm"
+    model: str = "tone"
+
+    def __init__(self, latency: float = 0.0, ms_per_char: float = 60.0,
+                 frame_rate: int = OPENAI_PCM_FRAME_RATE) -> None:
+        self.latency: float = latency
+        self.ms_per_char: float = ms_per_char
+        self.frame_rate: int = frame_rate
+
+    def synthesize(self, text: str, _voice: str) -> bytes:
+        """Return a tone as long as `text` would take to speak, as raw 16-bit mono PCM."""
+        if self.latency:
+            time.sleep(self.latency)
+        return tone_pcm(text, self.ms_per_char, self.frame_rate)
 
-    # Split the text by lines & initialize segments along with silence between segments
-    lines = text.split('\n')
-    audio_segments: list[AudioSegment] = []
-    silence: AudioSegment = AudioSegment.silent(duration=600)
 
+def synthesize_with_retry(backend: TTSBackend, text: str, voice: str,
+                          max_retries: int = 5, base_delay: float = 1.0) -> bytes:
+    """Synthesize `text`, backing off and retrying on rate limits and transient errors."""
+    return with_retry(lambda: backend.synthesize(text, voice), "tts.retries",
+                      max_retries, base_delay)
+
+def decode_audio(audio: bytes, backend: TTSBackend) -> AudioSegment:
+    """Turn a backend's output into an AudioSegment without going through a file."""
+    if backend.audio_format == "pcm":
+        return AudioSegment(data=audio, sample_width=2, frame_rate=backend.frame_rate, channels=1)
+    metrics.count("ffmpeg.invocations")
+    return AudioSegment.from_file(io.BytesIO(audio), format=backend.audio_format)
+
+def join_segments(segments: List[AudioSegment], pause_ms: int = 600) -> AudioSegment:
+    """Concatenate segments with a pause after each one, copying the audio only once."""
+    if not segments:
+        return AudioSegment.empty()
+    first: AudioSegment = segments[0]
+    silence: AudioSegment = (AudioSegment.silent(duration=pause_ms, frame_rate=first.frame_rate)
+                             .set_channels(first.channels)
+                             .set_sample_width(first.sample_width))
+    chunks: List[bytes] = []
+    for segment in segments:
+        segment = (segment.set_frame_rate(first.frame_rate)
+                   .set_channels(first.channels)
+                   .set_sample_width(first.sample_width))
+        chunks.append(segment.raw_data)
+        chunks.append(silence.raw_data)
+    return AudioSegment(data=b"".join(chunks), sample_width=first.sample_width,
+                        frame_rate=first.frame_rate, channels=first.channels)
+
+def split_line(line: str, max_chars: int = MAX_INPUT_CHARS) -> List[str]:
+    """Split a line that is too long for one request at sentence boundaries."""
+    pieces: List[str] = []
+    current: str = ""
+    for sentence in split_sentences(line):
+        # A single overlong sentence is split between words as a last resort
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars) if " " in sentence[:max_chars] else max_chars
+            pieces.extend([current] if current else [])
+            pieces.append(sentence[:cut])
+            current, sentence = "", sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+def pack_lines(lines: List[str], max_chars: int = MAX_INPUT_CHARS) -> List[List[str]]:
+    """
+    Group consecutive lines into requests of at most `max_chars` characters.
+
+    Lines longer than `max_chars` get a group of their own (`synthesize_line` splits them).
+    """
+    groups: List[List[str]] = []
+    size: int = 0
     for line in lines:
-        if line.strip():
-            response = client.audio.speech.create(
-                model="tts-1",
-                voice=voice,
-                input=line
-            )
-            temp_file_path: Path = cache_dir / f"{uuid.uuid4()}.mp3"
-            response.write_to_file(temp_file_path)
-            audio_segments.append(AudioSegment.from_mp3(temp_file_path))
+        if groups and size + len(LINE_SEPARATOR) + len(line) <= max_chars:
+            groups[-1].append(line)
+            size += len(LINE_SEPARATOR) + len(line)
+        else:
+            groups.append([line])
+            size = len(line)
+    return groups
+
+def load_cached_line(line: str, voice: str, backend: TTSBackend) -> Optional[AudioSegment]:
+    """Return a line's audio from the speech cache, if it is there."""
+    entry = get_speech_cache().lookup(get_speech_cache().make_key(backend.model, voice, line))
+    if entry is not None and entry.fresh:
+        metrics.count("tts.cache_hits")
+        return AudioSegment(data=entry.data, **entry.meta)
+    return None
+
+def store_line(line: str, voice: str, backend: TTSBackend, segment: AudioSegment) -> None:
+    """Add a line's audio to the speech cache."""
+    get_speech_cache().set(get_speech_cache().make_key(backend.model, voice, line),
+                           segment.raw_data, meta={
+                               "sample_width": segment.sample_width,
+                               "frame_rate": segment.frame_rate,
+                               "channels": segment.channels,
+                           })
+
+def request_speech(text: str, voice: str, backend: TTSBackend) -> AudioSegment:
+    """Synthesize `text` with one request."""
+    metrics.count("tts.requests")
+    metrics.count("tts.characters", len(text))
+    return decode_audio(synthesize_with_retry(backend, text, voice), backend)
+
+def synthesize_line(line: str, voice: str, backend: TTSBackend,
+                    use_cache: bool = True) -> AudioSegment:
+    """Synthesize one line, loading it from the speech cache when possible."""
+    if use_cache:
+        cached = load_cached_line(line, voice, backend)
+        if cached is not None:
+            return cached
+
+    if len(line) <= MAX_INPUT_CHARS:
+        segment = request_speech(line, voice, backend)
+    else:
+        segment = sum((request_speech(piece, voice, backend) for piece in split_line(line)),
+                      AudioSegment.empty())
+
+    if use_cache:
+        store_line(line, voice, backend, segment)
+    return segment
+
+def synthesize_group(lines: List[str], voice: str, backend: TTSBackend,
+                     use_cache: bool = True) -> AudioSegment:
+    """
+    Synthesize consecutive lines with a single request and return their audio.
+
+    The lines are sent as separate paragraphs, so the model pauses between them. The audio
+    is cached under the whole request, so a rerun of the same script reuses it.
+    """
+    if len(lines) > 1:
+        metrics.count("tts.packed_lines", len(lines))
+    return synthesize_line(LINE_SEPARATOR.join(lines), voice, backend, use_cache)
+
+def synthesize_lines(lines: List[str], voice: str,
+                     backend: Optional[TTSBackend] = None,
+                     max_workers: int = 4,
+                     use_cache: bool = True,
+                     max_chars: int = MAX_INPUT_CHARS) -> List[AudioSegment]:
+    """
+    Synthesize the lines concurrently and return their audio in the original order.
+
+    Consecutive lines are packed into as few requests as possible (at most `max_chars`
+    each), but into at least `max_workers` requests when there are enough lines, so packing
+    never costs parallelism. One segment is returned per request; the caller puts the usual
+    pause after each. Pass `max_chars=0` to send every line on its own.
+    Requests already in the speech cache are loaded from it instead of calling the backend.
+    """
+    backend = backend or OpenAITTSBackend()
+    total = sum(len(line) for line in lines)
+    groups = pack_lines(lines, min(max_chars, math.ceil(total / max(1, max_workers))))
+
+    # Repeated requests within one script are only synthesized once
+    unique_groups = list({LINE_SEPARATOR.join(group): group for group in groups}.values())
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        segments = dict(zip(map(LINE_SEPARATOR.join, unique_groups), executor.map(
+            lambda group: synthesize_group(group, voice, backend, use_cache), unique_groups)))
+    return [segments[LINE_SEPARATOR.join(group)] for group in groups]
+
+def iter_speech(lines: Iterable[str], voice: str = "nova",
+                backend: Optional[TTSBackend] = None,
+                max_workers: int = 4,
+                use_cache: bool = True,
+                pause_ms: int = 600,
+                max_chars: int = MAX_INPUT_CHARS) -> Iterator[AudioSegment]:
+    """
+    Synthesize lines concurrently and yield their audio in script order as soon as it's ready.
+
+    Each request is followed by `pause_ms` of silence, matching `gen_speech`. `lines` may
+    be a lazy iterable (e.g. paragraphs streamed from the script writer); at most two
+    requests per worker are synthesized ahead of what the consumer has taken.
+
+    Packing adapts to the load: a line is sent on its own as soon as a worker is free, so
+    the first audio is not delayed, while lines that arrive when every worker is busy are
+    packed together (up to `max_chars`) and sent with the next free worker.
+    """
+    backend = backend or OpenAITTSBackend()
+    pending: Deque[Future] = deque()
+    waiting: List[str] = []  # Lines not sent yet, packed into the next request
+
+    def ready(segment: AudioSegment) -> Iterator[AudioSegment]:
+        silence = (AudioSegment.silent(duration=pause_ms, frame_rate=segment.frame_rate)
+                   .set_channels(segment.channels)
+                   .set_sample_width(segment.sample_width))
+        yield segment
+        yield silence
 
-    combined_audio: AudioSegment = AudioSegment.empty()
-    for segment in audio_segments:
-        combined_audio += segment + silence
+    def send() -> None:
+        pending.append(executor.submit(synthesize_group, list(waiting), voice, backend,
+                                       use_cache))
+        waiting.clear()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        for line in lines:
+            if not line.strip():
+                continue
+            if waiting and len(LINE_SEPARATOR.join([*waiting, line])) > max_chars:
+                send()
+            waiting.append(line)
+            if sum(not future.done() for future in pending) < max_workers:
+                send()
+            while pending and (len(pending) > 2 * max_workers or pending[0].done()):
+                yield from ready(pending.popleft().result())
+        if waiting:
+            send()
+        while pending:
+            yield from ready(pending.popleft().result())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def gen_speech(text: str, voice: str = "nova",
+               backend: Optional[TTSBackend] = None,
+               max_workers: int = 4,
+               use_cache: bool = True,
+               as_segment: bool = False,
+               max_chars: int = MAX_INPUT_CHARS) -> Union[str, AudioSegment]:
+    """
+    Generate speech audio from given text using OpenAI TTS API.
+
+    Lines are synthesized in parallel on `max_workers` threads and joined in script order.
+    Pass a different `backend` (e.g. ToneTTSBackend) to synthesize without the API.
+    Previously synthesized lines are reused from the speech cache unless `use_cache` is False.
+    Consecutive lines are packed into requests of up to `max_chars` characters (see
+    `synthesize_lines`); the requests are joined with the same 600 ms pauses, and the model
+    pauses between the lines within one.
+
+    With `as_segment=True` the combined audio is returned in memory instead of being
+    encoded to an MP3 in the run's scratch directory, so the final export is the only encode.
+    """
+    # Split the text by lines & join the segments with silence between them
+    lines = [line for line in text.split('\n') if line.strip()]
+    audio_segments: list[AudioSegment] = synthesize_lines(lines, voice, backend,
+                                                          max_workers, use_cache, max_chars)
+    combined_audio: AudioSegment = join_segments(audio_segments, pause_ms=600)
+    if as_segment:
+        return combined_audio
 
-    final_file_path: Path = cache_dir / f"{uuid.uuid4()}.mp3"
+    final_file_path: Path = scratch_path() / f"{uuid.uuid4()}.mp3"
+    metrics.count("ffmpeg.invocations")
     combined_audio.export(final_file_path, format="mp3")
     return str(final_file_path)
 
@@ -0,0 +1,611 @@
+"""
+Resident worker: produce episodes from a local job queue with warm state.
+
+A cold `python main.py` re-imports openai, pydub and bs4, opens new HTTP connections and
+maps the audio assets again for every episode. The worker starts a fixed number of worker
+processes once; each imports everything, opens its pooled OpenAI client and loads the
+intro, outro and background music up front, then keeps them (and the caches) for every
+job it runs, so per-episode time is only the real work. Each process runs one job at a
+time, so `--workers` bounds concurrency and jobs never share a run report or scratch
+directory.
+
+Jobs are kept in a SQLite queue (`jobs/queue.sqlite3`) and survive restarts: a running
+job holds a lease that its process renews, and jobs whose process has exited or whose
+lease has expired are queued again when the next worker starts. Every job is a pipeline
+run (see pipeline.py), so a failed job can be resumed with `main.py resume`. Each job's
+output goes to `jobs/<job-id>.log`. If a worker process dies (e.g. killed for using too
+much memory), its job is marked failed and the processes are replaced; that stops the
+jobs running in the other processes too, and those are queued again.
+
+Usage:
+    python worker.py serve --workers 2 --port 8750
+    python worker.py submit --country us --max-articles 5 [--voice nova] [--new-only]
+                            [--renditions opus,hls] [--wait]
+    python worker.py status [JOB_ID]
+
+HTTP interface (served by `serve`, on localhost only):
+    POST /jobs         {"country": "us", "max_articles": 5, ...} -> 202 {"id": ..., ...}
+    GET  /jobs         The most recent jobs
+    GET  /jobs/<id>    One job
+    GET  /health       Queue counts and worker settings
+"""
+
+# Python standard libraries
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional
+
+# Local imports
+import metrics
+from terminal import Item
+from cleanup import cleanup_directory
+from scratch import HEARTBEAT_INTERVAL, LEASE_TTL, ScratchDir, process_alive
+from pipeline import PipelineRun, run_streaming, run_staged
+from audio_merge import background_music_files, get_renditions
+from asset_store import load_asset
+from openai_client import get_client
+
+JOBS_DIR: Path = Path(__file__).parent / "jobs"
+QUEUE_PATH: Path = JOBS_DIR / "queue.sqlite3"
+DEFAULT_PORT: int = 8750
+MAX_QUEUED: int = 100  # Submissions are refused while this many jobs are waiting
+POLL_INTERVAL: float = 1.0  # Seconds between checks for jobs submitted from other processes
+EXIT_GRACE: float = 1.0  # Seconds a dying worker process gets to exit before it counts as alive
+STATUSES: tuple = ("queued", "running", "done", "failed")
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    worker_pid INTEGER,
+    heartbeat REAL,
+    run_id TEXT,
+    audio_path TEXT,
+    report_path TEXT,
+    error TEXT
+)
+"""
+
+
+def validate_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a job's parameters with defaults filled in.
+
+    Raises:
+        ValueError: If a parameter is unknown or has the wrong type
+    """
+    defaults: Dict[str, Any] = {"country": "us", "max_articles": 5, "new_only": False,
+                                "voice": None, "pipelined": True, "renditions": None}
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown job parameters: {', '.join(sorted(unknown))}")
+    job = {**defaults, **params}
+    if not isinstance(job["country"], str) or len(job["country"]) != 2:
+        raise ValueError("'country' must be a 2-letter country code")
+    if (not isinstance(job["max_articles"], int) or isinstance(job["max_articles"], bool)
+            or not 1 <= job["max_articles"] <= 100):
+        raise ValueError("'max_articles' must be an integer from 1 to 100")
+    if job["voice"] is not None and not isinstance(job["voice"], str):
+        raise ValueError("'voice' must be a string")
+    if job["renditions"] is not None and (
+            not isinstance(job["renditions"], list)
+            or not all(isinstance(name, str) for name in job["renditions"])):
+        raise ValueError("'renditions' must be a list of rendition names")
+    if job["renditions"] is not None:
+        get_renditions(job["renditions"])  # Raises ValueError naming the unknown ones
+    for flag in ("new_only", "pipelined"):
+        if not isinstance(job[flag], bool):
+            raise ValueError(f"'{flag}' must be true or false")
+    job["country"] = job["country"].lower()
+    return job
+
+
+@dataclass
+class Job:
+    """One episode request and what became of it."""
+    id: str
+    status: str
+    params: Dict[str, Any]
+    submitted: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    worker_pid: Optional[int] = None
+    heartbeat: Optional[float] = None  # Last renewal of the running job's lease
+    run_id: Optional[str] = None
+    audio_path: Optional[str] = None
+    report_path: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def log_path(self) -> Path:
+        """Where the job's output is written."""
+        return JOBS_DIR / f"{self.id}.log"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the job as a JSON-serializable dictionary."""
+        return {**asdict(self), "log_path": str(self.log_path)}
+
+
+class JobQueue:
+    """SQLite-backed queue of episode jobs, shared by the worker and its clients."""
+
+    COLUMNS: str = ("id, status, params, submitted, started, finished, worker_pid, heartbeat, "
+                    "run_id, audio_path, report_path, error")
+
+    def __init__(self, path: Path = QUEUE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The worker and submitting clients use the queue at once; WAL keeps readers unblocked
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}
+        if "heartbeat" not in columns:  # Queue created by an older version
+            self.connection.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+
+    def _job(self, row: tuple) -> Job:
+        values = list(row)
+        values[2] = json.loads(values[2])
+        return Job(*values)
+
+    def submit(self, params: Dict[str, Any], max_queued: int = MAX_QUEUED) -> Job:
+        """
+        Add a job to the queue and return it.
+
+        Raises:
+            ValueError: If the parameters are invalid
+            OverflowError: If `max_queued` jobs are already waiting
+        """
+        params = validate_params(params)
+        if self.counts()["queued"] >= max_queued:
+            raise OverflowError(f"The queue already holds {max_queued} jobs")
+        job = Job(id=f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+                  status="queued", params=params, submitted=time.time())
+        self.connection.execute("INSERT INTO jobs (id, status, params, submitted) "
+                                "VALUES (?, ?, ?, ?)",
+                                (job.id, job.status, json.dumps(job.params), job.submitted))
+        return job
+
+    def claim(self, worker_pid: int) -> Optional[Job]:
+        """Mark the oldest queued job as running and return it, or None if none is waiting."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY submitted LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'running', started = ?, worker_pid = ?, "
+                    "heartbeat = ? WHERE id = ?", (now, worker_pid, now, row[0]))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return self.get(row[0]) if row is not None else None
+
+    def start(self, job_id: str, worker_pid: int) -> None:
+        """Record the worker process that is running a claimed job and take its lease."""
+        self.connection.execute(
+            "UPDATE jobs SET worker_pid = ?, heartbeat = ? WHERE id = ? AND status = 'running'",
+            (worker_pid, time.time(), job_id))
+
+    def renew(self, job_id: str, worker_pid: int) -> None:
+        """Extend the lease of a job that `worker_pid` is still running."""
+        self.connection.execute(
+            "UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running' "
+            "AND worker_pid = ?", (time.time(), job_id, worker_pid))
+
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        """Record the outcome returned by `run_job`."""
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, finished = ?, run_id = ?, audio_path = ?, "
+            "report_path = ?, error = ? WHERE id = ?",
+            ("failed" if result.get("error") else "done", time.time(), result.get("run_id"),
+             result.get("audio_path"), result.get("report_path"), result.get("error"), job_id))
+
+    def requeue(self, job_ids: List[str]) -> None:
+        """Put jobs back in the queue, e.g. after their worker process was stopped."""
+        self.connection.executemany(
+            "UPDATE jobs SET status = 'queued', started = NULL, worker_pid = NULL, "
+            "heartbeat = NULL WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def requeue_orphans(self) -> int:
+        """
+        Queue again the running jobs whose process no longer exists or no longer renews them.
+
+        A job records the worker process running it and renews a lease while it runs (see
+        `run_job`), so a job whose process crashed is found even while the server that
+        claimed it is still alive, and even once its process id has been reused.
+        """
+        expired = time.time() - LEASE_TTL
+        orphans = [job_id for job_id, pid, heartbeat in self.connection.execute(
+            "SELECT id, worker_pid, heartbeat FROM jobs WHERE status = 'running'")
+                   if pid is None or pid == os.getpid() or not process_alive(pid)
+                   or heartbeat is None or heartbeat < expired]
+        self.requeue(orphans)
+        return len(orphans)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with id `job_id`, if any."""
+        row = self.connection.execute(f"SELECT {self.COLUMNS} FROM jobs WHERE id = ?",
+                                      (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def recent(self, limit: int = 20) -> List[Job]:
+        """Return the most recently submitted jobs, newest first."""
+        return [self._job(row) for row in self.connection.execute(
+            f"SELECT {self.COLUMNS} FROM jobs ORDER BY submitted DESC LIMIT ?", (limit,))]
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs in each status."""
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self.connection.execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def warm_up() -> None:
+    """Prepare a worker process: open the OpenAI client and load the audio assets."""
+    # Ctrl+C stops the server; jobs that are already running are left to finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    get_client()
+    load_asset("public/news-intro.mp3", gain_db=-16)
+    load_asset("public/news-outro.mp3", gain_db=-16)
+    for bgm_path in background_music_files():
+        load_asset(bgm_path, gain_db=-26, fade_in_ms=1000)
+
+@contextmanager
+def job_lease(job_id: str, queue_path: Path = QUEUE_PATH) -> Generator[None, None, None]:
+    """Take the lease of a claimed job for this process and renew it until the block exits."""
+    with JobQueue(queue_path) as queue:
+        queue.start(job_id, os.getpid())
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                with JobQueue(queue_path) as queue:
+                    queue.renew(job_id, os.getpid())
+            except sqlite3.Error:
+                pass  # Try again on the next beat; the lease only expires after LEASE_TTL
+
+    heartbeat = threading.Thread(target=beat, daemon=True, name=f"job-{job_id}")
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+
+def run_job(job: Job, queue_path: Path = QUEUE_PATH) -> Dict[str, Any]:
+    """
+    Produce a job's episode in this worker process, record its outcome and return it.
+
+    Failures are returned rather than raised, together with the run id to resume. The
+    outcome is recorded here rather than by the server, so it isn't lost if the server
+    exits while the job is still running.
+    """
+    params = job.params
+    result: Dict[str, Any] = {}
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    # The lease tells other servers that the job is still running (see requeue_orphans)
+    with job_lease(job.id, queue_path), \
+            open(job.log_path, "a", encoding="utf-8") as log, redirect_stdout(log):
+        report: Optional[metrics.RunReport] = None
+        try:
+            run = PipelineRun.create(params["country"], params["max_articles"],
+                                     params["new_only"], params["voice"],
+                                     renditions=params["renditions"])
+            result["run_id"] = run.run_id
+            print(f"Job {job.id}: run {run.run_id}", flush=True)
+            report = metrics.new_report(run.run_id)  # reports/<run-id>.json
+            with ScratchDir(prefix="job"):
+                produce = run_streaming if params["pipelined"] else run_staged
+                result["audio_path"] = produce(run)
+            if result["audio_path"] is None:
+                print("No new stories since the last run.")
+        except Exception as e:  # pylint: disable=broad-except
+            traceback.print_exc(file=log)
+            result["error"] = f"{type(e).__name__}: {e}"
+            if report is not None:
+                report.error = result["error"]
+        if report is not None:
+            result["report_path"] = str(report.write())
+    with JobQueue(queue_path) as queue:
+        queue.finish(job.id, result)
+    return result
+
+
+class Worker:
+    """Takes jobs from the queue and runs them on a pool of warm worker processes."""
+
+    def __init__(self, workers: int = 2, queue_path: Path = QUEUE_PATH):
+        self.workers: int = workers
+        self.queue_path: Path = queue_path
+        self.pool: ProcessPoolExecutor = self._new_pool()
+        self._pool_lock = threading.Lock()
+        self.slots = threading.Semaphore(workers)
+        self.wake = threading.Event()  # Set when a job is submitted through this process
+        self.stopping = threading.Event()
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+
+    def start(self) -> "Worker":
+        """Queue orphaned jobs again and start dispatching."""
+        with JobQueue(self.queue_path) as queue:
+            requeued = queue.requeue_orphans()
+        if requeued:
+            Item.info(f"Re-queued {requeued} interrupted job(s)", indent=False)
+        # Start the worker processes now so the first job doesn't pay for their warm-up
+        for future in [self.pool.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+        self._dispatcher.start()
+        return self
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: the pool is replaced while the HTTP and dispatcher
+        # threads run, and a forked child would inherit any lock they hold
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up,
+                                   mp_context=multiprocessing.get_context("spawn"))
+
+    def _submit(self, job: Job) -> Future:
+        """Run `job` on the pool, replacing the pool first if one of its processes died."""
+        with self._pool_lock:
+            try:
+                return self.pool.submit(run_job, job, self.queue_path)
+            except BrokenProcessPool:
+                Item.failed("A worker process died; starting new ones", indent=False)
+                self.pool.shutdown(wait=False)
+                self.pool = self._new_pool()
+                return self.pool.submit(run_job, job, self.queue_path)
+
+    def _dispatch(self) -> None:
+        with JobQueue(self.queue_path) as queue:
+            while not self.stopping.is_set():
+                self.slots.acquire()  # pylint: disable=consider-using-with
+                job: Optional[Job] = None
+                try:
+                    job = None if self.stopping.is_set() else queue.claim(os.getpid())
+                    if job is None:
+                        self.slots.release()
+                        self.wake.wait(POLL_INTERVAL)
+                        self.wake.clear()
+                        continue
+                    Item.info(f"Job {job.id} started", indent=False)
+                    future = self._submit(job)
+                except Exception as e:  # pylint: disable=broad-except
+                    # Keep dispatching; a claimed job that couldn't be started is failed
+                    if job is None:
+                        Item.failed(f"Couldn't claim a job: {type(e).__name__}: {e}",
+                                    indent=False)
+                        self.slots.release()
+                        self.wake.wait(POLL_INTERVAL)
+                        continue
+                    future = Future()
+                    future.set_exception(e)
+                future.add_done_callback(lambda future, job=job: self._finished(job, future))
+
+    def _process_exited(self, job: Job) -> bool:
+        """
+        Return True if the worker process that started `job` has exited, or is exiting.
+
+        The pool notices a dead process a moment before it can be reaped, so a process
+        that is still there is given EXIT_GRACE seconds to go.
+        """
+        with JobQueue(self.queue_path) as queue:
+            current = queue.get(job.id)
+        pid = current.worker_pid if current is not None else None
+        if pid is None or pid == os.getpid():
+            return False  # Claimed, but never started by a worker process
+        deadline = time.monotonic() + EXIT_GRACE
+        while True:
+            multiprocessing.active_children()  # Reap exited workers so they don't count
+            if not process_alive(pid):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def _finished(self, job: Job, future: Future) -> None:
+        requeue = False
+        try:
+            result = future.result()  # Already recorded by run_job
+        except Exception as e:  # pylint: disable=broad-except
+            # The worker process itself failed (e.g. it was killed, which breaks the pool
+            # until `_submit` replaces it) or the job couldn't be started. A broken pool fails
+            # every job in it, before it stops the processes that are still running: only the
+            # job whose process has already exited is to blame, the others run again
+            requeue = isinstance(e, BrokenProcessPool) and not self._process_exited(job)
+            result = {"error": f"{type(e).__name__}: {e}"}
+            with JobQueue(self.queue_path) as queue:
+                if requeue:
+                    queue.requeue([job.id])
+                else:
+                    queue.finish(job.id, result)
+        if requeue:
+            Item.info(f"Job {job.id} re-queued: another worker process died", indent=False)
+        elif result.get("error"):
+            Item.failed(f"Job {job.id} failed: {result['error']}", indent=False)
+        else:
+            Item.checked(f"Job {job.id} done: '{result.get('audio_path')}'", indent=False)
+        self.slots.release()
+        self.wake.set()
+        cleanup_directory()
+
+    def stop(self) -> None:
+        """Stop taking jobs and wait for the running ones to finish."""
+        self.stopping.set()
+        self.wake.set()
+        self.slots.release()  # Unblock the dispatcher if every slot is busy
+        with self._pool_lock:
+            self.pool.shutdown(wait=True)
+
+
+def make_handler(worker: Worker, max_queued: int) -> type:
+    """Return the HTTP request handler class for `worker`."""
+
+    class JobHandler(BaseHTTPRequestHandler):
+        """Serves the job submission and status endpoints."""
+
+        def _reply(self, status: int, body: Any) -> None:
+            data = json.dumps(body, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:  # pylint: disable=invalid-name
+            """Return the health summary, the recent jobs or one job."""
+            with JobQueue(worker.queue_path) as queue:
+                if self.path == "/health":
+                    self._reply(200, {"workers": worker.workers, "max_queued": max_queued,
+                                      "jobs": queue.counts()})
+                elif self.path == "/jobs":
+                    self._reply(200, [job.to_dict() for job in queue.recent()])
+                elif self.path.startswith("/jobs/"):
+                    job = queue.get(self.path.removeprefix("/jobs/"))
+                    if job is None:
+                        self._reply(404, {"error": "No such job"})
+                    else:
+                        self._reply(200, job.to_dict())
+                else:
+                    self._reply(404, {"error": "Not found"})
+
+        def do_POST(self) -> None:  # pylint: disable=invalid-name
+            """Queue a job from a JSON object of parameters."""
+            if self.path != "/jobs":
+                self._reply(404, {"error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                params = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(params, dict):
+                    raise ValueError("The request body must be a JSON object")
+                with JobQueue(worker.queue_path) as queue:
+                    job = queue.submit(params, max_queued)
+            except ValueError as e:  # Includes malformed JSON
+                self._reply(400, {"error": str(e)})
+                return
+            except OverflowError as e:
+                self._reply(503, {"error": str(e)})
+                return
+            worker.wake.set()
+            self._reply(202, job.to_dict())
+
+        def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+            """Keep request logs out of the worker's output."""
+
+    return JobHandler
+
+def serve(workers: int = 2, port: int = DEFAULT_PORT, max_queued: int = MAX_QUEUED) -> None:
+    """Run the worker and its HTTP interface until interrupted."""
+    worker = Worker(workers)
+    print(f"Starting {workers} worker process(es)...")
+    worker.start()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(worker, max_queued))
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    Item.checked(f"Worker ready on http://127.0.0.1:{port} (queue: '{QUEUE_PATH}')",
+                 indent=False)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Waiting for running jobs to finish...")
+        worker.stop()
+
+def print_job(job: Job) -> None:
+    """Print a one-line summary of a job."""
+    detail = job.audio_path or job.error or ""
+    print(f"{job.id}  {job.status:<8} {job.params['country']}  {detail}")
+
+def main() -> None:
+    """Parse the command line and serve, submit or show jobs."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the worker and its HTTP interface")
+    serve_parser.add_argument("--workers", type=int, default=2,
+                              help="Worker processes, i.e. jobs that run at the same time")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--max-queued", type=int, default=MAX_QUEUED)
+
+    submit_parser = commands.add_parser("submit", help="Queue an episode")
+    submit_parser.add_argument("--country", default="us")
+    submit_parser.add_argument("--max-articles", type=int, default=5)
+    submit_parser.add_argument("--voice")
+    submit_parser.add_argument("--new-only", action="store_true")
+    submit_parser.add_argument("--renditions", metavar="NAMES",
+                               type=lambda value: [name for name in value.split(",") if name],
+                               help="Comma-separated extra formats (see main.py --help)")
+    submit_parser.add_argument("--sequential", action="store_true",
+                               help="Run each stage to completion before starting the next")
+    submit_parser.add_argument("--wait", action="store_true",
+                               help="Wait for the job to finish")
+
+    status_parser = commands.add_parser("status", help="Show recent jobs or one job")
+    status_parser.add_argument("job_id", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.workers, args.port, args.max_queued)
+        return
+
+    with JobQueue() as queue:
+        if args.command == "submit":
+            try:
+                job = queue.submit({"country": args.country, "max_articles": args.max_articles,
+                                    "voice": args.voice, "new_only": args.new_only,
+                                    "pipelined": not args.sequential,
+                                    "renditions": args.renditions})
+            except (ValueError, OverflowError) as e:
+                parser.error(str(e))
+            print(f"Queued job {job.id}")
+            while args.wait and job.status in ("queued", "running"):
+                time.sleep(POLL_INTERVAL)
+                job = queue.get(job.id)
+            if args.wait:
+                print_job(job)
+                sys.exit(1 if job.status == "failed" else 0)
+        elif args.job_id:
+            job = queue.get(args.job_id)
+            if job is None:
+                parser.error(f"no job '{args.job_id}'")
+            print(json.dumps(job.to_dict(), indent=2))
+        else:
+            for job in reversed(queue.recent()):
+                print_job(job)
+
+
+if __name__ == "__main__":
+    main()